@@ -0,0 +1,173 @@
+# routeProject/benchmark.py
+"""
+Benchmarks del optimizador (sin red: las matrices se estiman con haversine).
+
+Uso:
+    python benchmark.py callback --puntos 300 --segundos 30
+    python benchmark.py vrp --puntos 400 --cuentas 40 --segundos 30
+    python benchmark.py limpieza --archivo datos/entrada/entrada.csv --factor 100
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from ortools.constraint_solver import routing_enums_pb2
+from ortools.constraint_solver import pywrapcp
+from distancias import matriz_tiempos_haversine
+from limpiador_direcciones import limpiar_campo, limpiar_serie
+from optimizador_rutas import OptimizadorRutas
+from utils import dividir_por_notificadores
+
+
+class OptimizadorSinRed(OptimizadorRutas):
+    """Optimizador que estima los tiempos con haversine en lugar de pedirlos a OSRM"""
+
+    def obtener_matriz_tiempos(self, coordenadas):
+        return self._matriz_distancias_euclidianas(coordenadas)
+
+
+def coordenadas_aleatorias(n: int, semilla: int = 0) -> np.ndarray:
+    """Puntos aleatorios en el área metropolitana de Guadalajara"""
+    rng = np.random.default_rng(semilla)
+    lats = 20.6597 + rng.uniform(-0.12, 0.12, n)
+    lons = -103.3496 + rng.uniform(-0.15, 0.15, n)
+    return np.column_stack([lats, lons])
+
+
+def _resolver_con_conteo(optimizador: OptimizadorRutas, matriz: np.ndarray,
+                         nativo: bool, segundos: int) -> dict:
+    """Resuelve el TSP contando soluciones aceptadas y ramas exploradas"""
+    manager = pywrapcp.RoutingIndexManager(len(matriz), 1, 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    indice = optimizador._registrar_matriz(routing, manager, matriz, nativo=nativo)
+    routing.SetArcCostEvaluatorOfAllVehicles(indice)
+    routing.AddDimension(indice, 0, 10 ** 9, True, 'Time')
+
+    mejoras = [0]
+    routing.AddAtSolutionCallback(lambda: mejoras.__setitem__(0, mejoras[0] + 1))
+
+    parametros = pywrapcp.DefaultRoutingSearchParameters()
+    parametros.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    parametros.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    parametros.time_limit.seconds = segundos
+
+    inicio = time.perf_counter()
+    solucion = routing.SolveWithParameters(parametros)
+    solver = routing.solver()
+    return {
+        'objetivo': solucion.ObjectiveValue() if solucion else None,
+        'soluciones': mejoras[0],
+        'ramas': solver.Branches(),
+        'fallas': solver.Failures(),
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+def benchmark_callback(args):
+    """Callback de Python por arco vs. matriz registrada en C++ con el mismo límite de tiempo"""
+    coords = coordenadas_aleatorias(args.puntos, args.semilla)
+    matriz = matriz_tiempos_haversine(coords[:, 0], coords[:, 1])
+    optimizador = OptimizadorRutas(usar_cache_tiempos=False)
+
+    print(f"TSP de {args.puntos} puntos, límite de {args.segundos} s por corrida")
+    resultados = {}
+    for nombre, nativo in (('callback Python', False), ('matriz nativa', True)):
+        r = _resolver_con_conteo(optimizador, matriz, nativo, args.segundos)
+        resultados[nombre] = r
+        print(f"   {nombre:16s} objetivo={r['objetivo']} min, soluciones={r['soluciones']}, "
+              f"ramas={r['ramas']}, fallas={r['fallas']}, {r['segundos']:.1f} s")
+
+    base = resultados['callback Python']['ramas'] or 1
+    print(f"Iteraciones de búsqueda local (ramas): x{resultados['matriz nativa']['ramas'] / base:.1f}")
+
+
+def _minutos_ruta(chunk: pd.DataFrame, ruta, optimizador: OptimizadorRutas) -> int:
+    """Minutos de manejo de una ruta abierta (sin regreso al inicio, como las del VRP)"""
+    if len(ruta) < 2:
+        return 0
+    puntos = chunk.iloc[list(ruta)]
+    matriz = matriz_tiempos_haversine(puntos['lat'].to_numpy(), puntos['lon'].to_numpy(),
+                                      optimizador.velocidad_kmh, optimizador.minimo_minutos)
+    return int(np.trace(matriz, offset=1))
+
+
+def benchmark_vrp(args):
+    """Un solo VRP con capacidad vs. dividir por notificadores y resolver cada parte"""
+    coords = coordenadas_aleatorias(args.puntos, args.semilla)
+    df = pd.DataFrame({'lat': coords[:, 0], 'lon': coords[:, 1], 'Cuenta': range(args.puntos)})
+    optimizador = OptimizadorSinRed(usar_cache_tiempos=False)
+    optimizador.tiempo_limite = args.segundos
+
+    print(f"Zona de {args.puntos} cuentas, {args.cuentas} por notificador, límite de {args.segundos} s por solve")
+
+    inicio = time.perf_counter()
+    resultados = []
+    for chunk in dividir_por_notificadores(df, args.cuentas, args.particion):
+        rutas = optimizador.optimizar_ruta(chunk, 1)
+        if rutas:
+            resultados.append((chunk, rutas[0]))
+    segundos_chunks = time.perf_counter() - inicio
+    minutos_chunks = sum(_minutos_ruta(chunk, ruta, optimizador) for chunk, ruta in resultados)
+
+    inicio = time.perf_counter()
+    flota = optimizador.optimizar_flota(df, args.cuentas) or []
+    segundos_vrp = time.perf_counter() - inicio
+    minutos_vrp = sum(_minutos_ruta(chunk, ruta, optimizador) for chunk, ruta in flota)
+
+    print(f"\n   dividir ({args.particion}) y resolver: {len(resultados)} rutas, "
+          f"{minutos_chunks} min de manejo, {segundos_chunks:.1f} s")
+    print(f"   VRP único:                  {len(flota)} rutas, "
+          f"{minutos_vrp} min de manejo, {segundos_vrp:.1f} s")
+
+
+def benchmark_limpieza(args):
+    """limpiar_campo fila por fila (.apply) vs. limpiar_serie sobre la columna completa"""
+    df = pd.read_csv(args.archivo, encoding='utf-8-sig')
+    df = pd.concat([df] * args.factor, ignore_index=True)
+    columnas = [col for col in ('Domicilio', 'Colonia') if col in df.columns]
+
+    print(f"{len(df):,} filas ({args.archivo} x{args.factor}), columnas: {', '.join(columnas)}")
+    for columna in columnas:
+        inicio = time.perf_counter()
+        por_fila = df[columna].apply(limpiar_campo)
+        segundos_fila = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        vectorizada = limpiar_serie(df[columna])
+        segundos_serie = time.perf_counter() - inicio
+
+        iguales = por_fila.fillna('').tolist() == vectorizada.fillna('').tolist()
+        print(f"   {columna:10s} apply={segundos_fila:.2f} s, serie={segundos_serie:.2f} s, "
+              f"x{segundos_fila / segundos_serie:.1f}, resultado idéntico: {'sí' if iguales else 'NO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del optimizador de rutas')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_callback = subparsers.add_parser('callback', help='Callback de Python vs. RegisterTransitMatrix')
+    p_callback.add_argument('--puntos', type=int, default=300)
+    p_callback.add_argument('--segundos', type=int, default=30)
+    p_callback.add_argument('--semilla', type=int, default=0)
+    p_callback.set_defaults(funcion=benchmark_callback)
+
+    p_vrp = subparsers.add_parser('vrp', help='VRP multi-vehículo vs. dividir y resolver')
+    p_vrp.add_argument('--puntos', type=int, default=400)
+    p_vrp.add_argument('--cuentas', type=int, default=40)
+    p_vrp.add_argument('--segundos', type=int, default=30)
+    p_vrp.add_argument('--particion', choices=['hilbert', 'orden'], default='orden')
+    p_vrp.add_argument('--semilla', type=int, default=0)
+    p_vrp.set_defaults(funcion=benchmark_vrp)
+
+    p_limpieza = subparsers.add_parser('limpieza', help='limpiar_campo por fila vs. limpiar_serie')
+    p_limpieza.add_argument('--archivo', default='datos/entrada/entrada.csv')
+    p_limpieza.add_argument('--factor', type=int, default=100)
+    p_limpieza.set_defaults(funcion=benchmark_limpieza)
+
+    args = parser.parse_args()
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    main()
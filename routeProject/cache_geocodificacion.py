@@ -0,0 +1,150 @@
+# routeProject/cache_geocodificacion.py
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class CacheGeocodificacion:
+    """Caché persistente (SQLite) de resultados de Nominatim por consulta normalizada"""
+
+    def __init__(self, ruta: str = "datos/salida/cache_geocodificacion.sqlite",
+                 ttl_dias: float = 90, max_entradas: int = 200000, ttl_negativo_dias: float = 7):
+        self.ruta = ruta
+        self.ttl_segundos = ttl_dias * 24 * 3600 if ttl_dias else None
+        # Las consultas sin resultado vencen antes: OSM se corrige y se completa
+        self.ttl_negativo_segundos = ttl_negativo_dias * 24 * 3600 if ttl_negativo_dias else None
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS geocodificacion (
+                clave TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                display_name TEXT,
+                fuera_radio INTEGER NOT NULL DEFAULT 0,
+                creado REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+        self._conexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_geocodificacion_acceso ON geocodificacion (ultimo_acceso)")
+        self._conexion.commit()
+        # Cota superior del número de entradas: se cuenta una vez y luego se suman
+        # las escrituras, así no hay COUNT(*) en cada dirección guardada
+        self._entradas_estimadas = self._conexion.execute(
+            "SELECT COUNT(*) FROM geocodificacion").fetchone()[0]
+
+    @staticmethod
+    def normalizar_clave(query: str, zona: str = None) -> str:
+        """Clave de caché: consulta en minúsculas y sin espacios repetidos (+ zona para el radio)"""
+        clave = re.sub(r'\s+', ' ', str(query).strip().lower())
+        zona_limpia = re.sub(r'\s+', ' ', str(zona).strip().lower()) if zona is not None else ''
+        return f"{clave}|{zona_limpia}"
+
+    def obtener(self, clave: str) -> Optional[Tuple[Optional[float], Optional[float], Optional[str]]]:
+        """
+        Devuelve (lat, lon, display_name) si la clave está vigente, o None si no está.
+        
+        Un resultado negativo vigente (consulta que Nominatim no encontró) se
+        devuelve como (None, None, None).
+        """
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT lat, lon, display_name, fuera_radio, creado FROM geocodificacion WHERE clave = ?",
+                (clave,)).fetchone()
+
+            if fila is None:
+                self.fallos += 1
+                return None
+
+            lat, lon, display_name, fuera_radio, creado = fila
+            negativo = lat is None and display_name is None and not fuera_radio
+            ttl = self.ttl_negativo_segundos if negativo else self.ttl_segundos
+            if ttl is not None and ahora - creado > ttl:
+                # Entrada vencida: eliminar y tratar como fallo
+                self._conexion.execute("DELETE FROM geocodificacion WHERE clave = ?", (clave,))
+                self._conexion.commit()
+                self.fallos += 1
+                return None
+
+            self._conexion.execute(
+                "UPDATE geocodificacion SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave))
+            self._conexion.commit()
+            self.aciertos += 1
+
+        if fuera_radio:
+            return None, None, display_name
+        return lat, lon, display_name
+
+    def guardar(self, clave: str, lat: Optional[float], lon: Optional[float],
+                display_name: Optional[str], fuera_radio: bool = False):
+        """Guarda un resultado (exitoso o fuera de radio) y aplica el límite de tamaño"""
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO geocodificacion "
+                "(clave, lat, lon, display_name, fuera_radio, creado, ultimo_acceso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (clave, lat, lon, display_name, int(fuera_radio), ahora, ahora))
+            self._entradas_estimadas += 1
+            self._desalojar()
+            self._conexion.commit()
+
+    def guardar_negativo(self, clave: str):
+        """Registra que Nominatim no encontró la consulta (se reintenta al vencer su TTL)"""
+        self.guardar(clave, None, None, None)
+
+    def _desalojar(self):
+        """
+        Elimina las entradas menos usadas recientemente si se excede max_entradas.
+
+        Solo cuenta de verdad cuando la cota estimada pasa el límite, y entonces
+        baja al 90% para que el siguiente conteo tarde en volver a hacer falta.
+        """
+        if not self.max_entradas or self._entradas_estimadas <= self.max_entradas:
+            return
+        total = self._conexion.execute("SELECT COUNT(*) FROM geocodificacion").fetchone()[0]
+        exceso = total - int(self.max_entradas * 0.9) if total > self.max_entradas else 0
+        if exceso > 0:
+            self._conexion.execute(
+                "DELETE FROM geocodificacion WHERE clave IN ("
+                "SELECT clave FROM geocodificacion ORDER BY ultimo_acceso ASC LIMIT ?)",
+                (exceso,))
+        self._entradas_estimadas = total - max(exceso, 0)
+
+    def limpiar_vencidos(self) -> int:
+        """Elimina todas las entradas vencidas y devuelve cuántas se borraron"""
+        ahora = time.time()
+        borradas = 0
+        with self._lock:
+            if self.ttl_segundos is not None:
+                borradas += self._conexion.execute(
+                    "DELETE FROM geocodificacion WHERE creado < ?", (ahora - self.ttl_segundos,)).rowcount
+            if self.ttl_negativo_segundos is not None:
+                borradas += self._conexion.execute(
+                    "DELETE FROM geocodificacion WHERE lat IS NULL AND display_name IS NULL "
+                    "AND fuera_radio = 0 AND creado < ?", (ahora - self.ttl_negativo_segundos,)).rowcount
+            self._conexion.commit()
+        return borradas
+
+    def estadisticas(self) -> str:
+        """Resumen de aciertos y fallos de la caché"""
+        total = self.aciertos + self.fallos
+        tasa = (self.aciertos / total * 100) if total else 0.0
+        return f"Caché de geocodificación: {self.aciertos} aciertos, {self.fallos} fallos ({tasa:.1f}% aciertos)"
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
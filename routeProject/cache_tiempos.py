@@ -0,0 +1,149 @@
+# routeProject/cache_tiempos.py
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import List, Tuple
+
+
+class CacheTiempos:
+    """Caché persistente (SQLite) de tiempos OSRM por par de coordenadas redondeadas, con desalojo LRU"""
+
+    def __init__(self, ruta: str = "datos/salida/cache_tiempos.sqlite",
+                 max_entradas: int = 2000000, decimales: int = 5):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.decimales = decimales
+        self.pares_acierto = 0
+        self.pares_fallo = 0
+        self._lock = threading.Lock()
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS tiempos (
+                origen TEXT NOT NULL,
+                destino TEXT NOT NULL,
+                minutos INTEGER NOT NULL,
+                ultimo_acceso REAL NOT NULL,
+                PRIMARY KEY (origen, destino)
+            ) WITHOUT ROWID
+        """)
+        self._conexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tiempos_acceso ON tiempos (ultimo_acceso)")
+        self._conexion.commit()
+        # Cota superior del número de pares: se cuenta una vez y luego se suman las
+        # escrituras (un reemplazo también suma), así no hay COUNT(*) en cada bloque
+        self._entradas_estimadas = self._conexion.execute("SELECT COUNT(*) FROM tiempos").fetchone()[0]
+
+    def claves(self, coordenadas: List[Tuple[float, float]]) -> List[str]:
+        """Clave de cada punto: lat,lon redondeadas (5 decimales ~ 1 m)"""
+        return [f"{lat:.{self.decimales}f},{lon:.{self.decimales}f}" for lat, lon in coordenadas]
+
+    def obtener(self, claves: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca todos los pares claves x claves.
+
+        Devuelve (matriz de minutos, máscara de pares conocidos). La diagonal
+        siempre se considera conocida con costo 0.
+        """
+        k = len(claves)
+        posicion = {clave: i for i, clave in enumerate(claves)}
+        matriz = np.zeros((k, k), dtype=np.int32)
+        conocidos = np.zeros((k, k), dtype=bool)
+        np.fill_diagonal(conocidos, True)
+
+        ahora = time.time()
+        with self._lock:
+            for inicio in range(0, k, 500):
+                lote = claves[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(lote))
+                filas = self._conexion.execute(
+                    f"SELECT origen, destino, minutos FROM tiempos WHERE origen IN ({marcadores})", lote)
+                for origen, destino, minutos in filas:
+                    j = posicion.get(destino)
+                    if j is not None:
+                        i = posicion[origen]
+                        matriz[i, j] = minutos
+                        conocidos[i, j] = True
+                self._conexion.execute(
+                    f"UPDATE tiempos SET ultimo_acceso = ? WHERE origen IN ({marcadores})", [ahora] + lote)
+            self._conexion.commit()
+
+        aciertos = int(conocidos.sum()) - k
+        self.pares_acierto += aciertos
+        self.pares_fallo += k * k - k - aciertos
+        return matriz, conocidos
+
+    def guardar(self, claves_origen: List[str], claves_destino: List[str], bloque: np.ndarray):
+        """Guarda un bloque origen x destino obtenido de OSRM"""
+        ahora = time.time()
+        registros = [(origen, destino, int(bloque[i, j]), ahora)
+                     for i, origen in enumerate(claves_origen)
+                     for j, destino in enumerate(claves_destino)
+                     if origen != destino]
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO tiempos (origen, destino, minutos, ultimo_acceso) VALUES (?, ?, ?, ?)",
+                registros)
+            self._entradas_estimadas += len(registros)
+            self._desalojar()
+            self._conexion.commit()
+
+    def _desalojar(self):
+        """
+        Elimina los pares usados hace más tiempo si se excede max_entradas.
+
+        Solo cuenta de verdad cuando la cota estimada pasa el límite, y entonces
+        baja al 90% para que el siguiente conteo tarde en volver a hacer falta.
+        """
+        if not self.max_entradas or self._entradas_estimadas <= self.max_entradas:
+            return
+        total = self._conexion.execute("SELECT COUNT(*) FROM tiempos").fetchone()[0]
+        exceso = total - int(self.max_entradas * 0.9) if total > self.max_entradas else 0
+        if exceso > 0:
+            self._conexion.execute(
+                "DELETE FROM tiempos WHERE (origen, destino) IN ("
+                "SELECT origen, destino FROM tiempos ORDER BY ultimo_acceso ASC LIMIT ?)",
+                (exceso,))
+        self._entradas_estimadas = total - max(exceso, 0)
+
+    def estadisticas(self) -> str:
+        total = self.pares_acierto + self.pares_fallo
+        tasa = (self.pares_acierto / total * 100) if total else 0.0
+        return f"Caché de tiempos: {self.pares_acierto} pares en caché, {self.pares_fallo} pedidos a OSRM ({tasa:.1f}% aciertos)"
+
+
+def pares_faltantes(conocidos: np.ndarray) -> Tuple[List[int], bool]:
+    """
+    Elige los puntos "nuevos" cuyos renglones y columnas cubren todos los pares faltantes.
+
+    Cobertura voraz: toma el punto con más pares faltantes hasta cubrirlos todos.
+    Devuelve (puntos nuevos, pedir_todo); pedir_todo es True cuando falta tanto
+    que conviene pedir la matriz completa.
+    """
+    pendientes = ~conocidos
+    k = len(conocidos)
+    if not pendientes.any():
+        return [], False
+    if pendientes.mean() > 0.5:
+        return list(range(k)), True
+
+    grado = pendientes.sum(axis=0) + pendientes.sum(axis=1)
+    nuevos = []
+    while grado.max() > 0:
+        i = int(np.argmax(grado))
+        nuevos.append(i)
+        # Quitar la contribución del renglón y la columna i a los demás puntos
+        grado -= pendientes[i, :].astype(np.int64) + pendientes[:, i].astype(np.int64)
+        pendientes[i, :] = False
+        pendientes[:, i] = False
+        grado[i] = 0
+        if len(nuevos) > k // 2:
+            return list(range(k)), True
+
+    return nuevos, False
@@ -0,0 +1,122 @@
+# routeProject/cargador.py
+import codecs
+import hashlib
+import json
+import os
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (solo para saber si Feather está disponible)
+except ImportError:
+    pyarrow = None
+
+try:
+    from config import CACHE_TABLAS_DIR
+except ImportError:
+    CACHE_TABLAS_DIR = "datos/cache"
+
+# Codificaciones a probar en orden; utf-8-sig también lee UTF-8 sin BOM
+CODIFICACIONES = ('utf-8-sig', 'latin-1')
+
+
+def _leer_archivo(ruta: str) -> pd.DataFrame:
+    """Parsea CSV (probando codificaciones) o Excel"""
+    if ruta.lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(ruta)
+
+    for codificacion in CODIFICACIONES[:-1]:
+        try:
+            return pd.read_csv(ruta, encoding=codificacion)
+        except UnicodeDecodeError:
+            continue
+    return pd.read_csv(ruta, encoding=CODIFICACIONES[-1])
+
+
+def detectar_codificacion(ruta: str, tamano_muestra: int = 1 << 20) -> str:
+    """
+    Elige la codificación de un CSV leyendo solo los primeros bytes.
+
+    Para archivos demasiado grandes para reintentar la lectura completa con
+    cada codificación; un byte inválido después de la muestra hará fallar la
+    lectura en lugar de pasar desapercibido.
+    """
+    with open(ruta, 'rb') as archivo:
+        muestra = archivo.read(tamano_muestra)
+
+    for codificacion in CODIFICACIONES[:-1]:
+        try:
+            # final=False tolera un carácter multibyte cortado al final de la muestra
+            codecs.getincrementaldecoder(codificacion)().decode(muestra, final=False)
+            return codificacion
+        except UnicodeDecodeError:
+            continue
+    return CODIFICACIONES[-1]
+
+
+def _rutas_cache(ruta: str, directorio: str):
+    """Archivos de caché de una entrada: uno por ruta, se sobrescribe al cambiar"""
+    clave = hashlib.sha1(os.path.abspath(ruta).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(directorio, clave)
+    return base + '.json', base
+
+
+def cargar_tabla(ruta: str, usar_cache: bool = True, directorio: str = None) -> pd.DataFrame:
+    """
+    Carga un CSV/Excel de entrada pasando por una caché columnar en disco.
+
+    La primera lectura parsea el archivo y guarda el DataFrame tipado (Feather
+    si pyarrow está instalado, si no pickle). Las siguientes lo leen directo
+    mientras no cambien la ruta, la fecha de modificación ni el tamaño.
+    """
+    if not usar_cache:
+        return _leer_archivo(ruta)
+
+    directorio = directorio or CACHE_TABLAS_DIR
+    info = os.stat(ruta)
+    firma = {'ruta': os.path.abspath(ruta), 'mtime_ns': info.st_mtime_ns, 'tamano': info.st_size}
+    ruta_meta, base = _rutas_cache(ruta, directorio)
+
+    try:
+        with open(ruta_meta, 'r', encoding='utf-8') as archivo:
+            meta = json.load(archivo)
+        if all(meta.get(campo) == valor for campo, valor in firma.items()):
+            if meta['formato'] == 'feather':
+                return pd.read_feather(base + '.feather')
+            return pd.read_pickle(base + '.pkl')
+    except (OSError, ValueError, KeyError):
+        pass
+    except Exception as e:
+        print(f"Caché de '{ruta}' ilegible ({e}) - se vuelve a leer el archivo")
+
+    df = _leer_archivo(ruta)
+
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        formato = _guardar(df, base)
+        temporal = ruta_meta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(dict(firma, formato=formato), archivo)
+        os.replace(temporal, ruta_meta)
+    except Exception as e:
+        print(f"No se pudo guardar la caché de '{ruta}': {e}")
+
+    return df
+
+
+def _guardar(df: pd.DataFrame, base: str) -> str:
+    """Escribe el DataFrame (Feather o pickle) de forma atómica; devuelve el formato usado"""
+    if pyarrow is not None:
+        try:
+            temporal = base + '.feather.tmp'
+            # Feather exige índice por defecto y nombres de columna en texto
+            df.reset_index(drop=True).rename(columns=str).to_feather(temporal)
+            os.replace(temporal, base + '.feather')
+            return 'feather'
+        except Exception:
+            # Columnas con tipos mezclados: pickle sí las soporta
+            pass
+
+    temporal = base + '.pkl.tmp'
+    df.to_pickle(temporal)
+    os.replace(temporal, base + '.pkl')
+    return 'pickle'
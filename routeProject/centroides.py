@@ -0,0 +1,140 @@
+# routeProject/centroides.py
+import argparse
+import os
+import re
+import unicodedata
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from cargador import cargar_tabla
+from proyecciones import reproyectar_columnas
+
+try:
+    from config import GEOCODING_CENTROIDES_PATH
+except ImportError:
+    GEOCODING_CENTROIDES_PATH = "datos/entrada/centroides.csv"
+
+try:
+    from config import UTM_ZONA, UTM_HEMISFERIO_NORTE
+except ImportError:
+    UTM_ZONA = 13
+    UTM_HEMISFERIO_NORTE = True
+
+
+def normalizar_nombre(texto) -> str:
+    """Colonia/zona para comparar: minúsculas, sin acentos y con espacios simples"""
+    if texto is None or pd.isna(texto):
+        return ''
+    texto = unicodedata.normalize('NFD', str(texto).strip().lower())
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+    return re.sub(r'\s+', ' ', texto)
+
+
+def normalizar_cp(cp) -> str:
+    """CP de 5 dígitos, o '' si no hay (acepta 44100, 44100.0 o '44100')"""
+    if cp is None or pd.isna(cp):
+        return ''
+    texto = re.sub(r'\.0+$', '', str(cp).strip())
+    digitos = re.sub(r'\D', '', texto)
+    return digitos[:5].zfill(5) if digitos else ''
+
+
+class TablaCentroides:
+    """
+    Centroides locales por colonia (dentro de su zona) y por código postal.
+
+    Sirven para ubicar una dirección sin consultar la red: el punto es la
+    mediana de las direcciones ya ubicadas de esa colonia o CP.
+    """
+
+    def __init__(self, ruta: str = None):
+        self.ruta = ruta or GEOCODING_CENTROIDES_PATH
+        self._centroides: Dict[Tuple[str, str], Tuple[float, float, int]] = {}
+        if os.path.exists(self.ruta):
+            tabla = pd.read_csv(self.ruta, dtype={'tipo': str, 'clave': str}, keep_default_na=False)
+            for fila in tabla.itertuples(index=False):
+                self._centroides[(fila.tipo, fila.clave)] = (float(fila.lat), float(fila.lon), int(fila.filas))
+
+    def __len__(self) -> int:
+        return len(self._centroides)
+
+    def buscar(self, colonia=None, cp=None, zona=None) -> Optional[Tuple[float, float, str]]:
+        """(lat, lon, descripción) del centroide más específico disponible, o None"""
+        colonia_norm = normalizar_nombre(colonia)
+        if colonia_norm:
+            encontrado = self._centroides.get(('colonia', f"{colonia_norm}|{normalizar_nombre(zona)}"))
+            if encontrado is not None:
+                return encontrado[0], encontrado[1], f"CENTROIDE de colonia {str(colonia).strip()}"
+
+        cp_norm = normalizar_cp(cp)
+        if cp_norm:
+            encontrado = self._centroides.get(('cp', cp_norm))
+            if encontrado is not None:
+                return encontrado[0], encontrado[1], f"CENTROIDE de CP {cp_norm}"
+
+        return None
+
+
+def construir_centroides(df: pd.DataFrame, ruta: str = None) -> int:
+    """
+    Calcula los centroides de un DataFrame con coordenadas en grados (lat/lon)
+    y columnas Colonia, Zona y/o Cp, y los guarda en ruta. Devuelve cuántos hay.
+    """
+    ruta = ruta or GEOCODING_CENTROIDES_PATH
+    df = df[df['lat'].notna() & df['lon'].notna()]
+    columnas = {col.lower(): col for col in df.columns}
+
+    grupos = []
+    if 'colonia' in columnas:
+        zona = df[columnas['zona']].map(normalizar_nombre) if 'zona' in columnas else ''
+        clave = df[columnas['colonia']].map(normalizar_nombre) + '|' + zona
+        grupos.append(('colonia', clave[df[columnas['colonia']].map(normalizar_nombre) != '']))
+    if 'cp' in columnas:
+        clave = df[columnas['cp']].map(normalizar_cp)
+        grupos.append(('cp', clave[clave != '']))
+
+    tablas = []
+    for tipo, clave in grupos:
+        agrupado = df.loc[clave.index, ['lat', 'lon']].groupby(clave)
+        tabla = agrupado.median()
+        tabla['filas'] = agrupado.size()
+        tabla['tipo'] = tipo
+        tablas.append(tabla.rename_axis('clave').reset_index())
+
+    if not tablas:
+        print("No hay columnas Colonia ni CP para calcular centroides")
+        return 0
+
+    resultado = pd.concat(tablas, ignore_index=True)[['tipo', 'clave', 'lat', 'lon', 'filas']]
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    resultado.to_csv(ruta, index=False, encoding='utf-8')
+    return len(resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Construye la tabla local de centroides por colonia y CP a partir de un CSV con coordenadas')
+    parser.add_argument('-e', '--entrada', required=True, help='CSV/Excel con Latitud/Longitud (grados o UTM)')
+    parser.add_argument('-s', '--salida', default=GEOCODING_CENTROIDES_PATH, help='Tabla de centroides a escribir')
+    args = parser.parse_args()
+
+    df = cargar_tabla(args.entrada)
+    df.columns = df.columns.str.strip().str.title()
+    df = df.rename(columns={'Latitud': 'lat', 'Longitud': 'lon', 'Lat': 'lat', 'Lon': 'lon'})
+    if 'lat' not in df.columns or 'lon' not in df.columns:
+        print("El archivo no tiene columnas de coordenadas")
+        exit(1)
+
+    lat, lon, _ = reproyectar_columnas(pd.to_numeric(df['lat'], errors='coerce'),
+                                       pd.to_numeric(df['lon'], errors='coerce'),
+                                       UTM_ZONA, UTM_HEMISFERIO_NORTE)
+    df['lat'] = lat
+    df['lon'] = lon
+
+    total = construir_centroides(df, args.salida)
+    print(f"{total} centroides guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# routeProject/cliente_http.py
+import bisect
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+# Límites superiores (ms) de los buckets del histograma de latencias
+BUCKETS_LATENCIA_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Respuestas que se reintentan (además de errores de conexión y timeouts)
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+
+class HistogramaLatencias:
+    """Histograma de latencias por endpoint con conteo de errores"""
+
+    def __init__(self):
+        self.conteos = [0] * (len(BUCKETS_LATENCIA_MS) + 1)
+        self.total = 0
+        self.errores = 0
+        self.suma_ms = 0.0
+        self.maximo_ms = 0.0
+
+    def registrar(self, latencia_ms: float, error: bool = False):
+        self.conteos[bisect.bisect_left(BUCKETS_LATENCIA_MS, latencia_ms)] += 1
+        self.total += 1
+        self.suma_ms += latencia_ms
+        self.maximo_ms = max(self.maximo_ms, latencia_ms)
+        if error:
+            self.errores += 1
+
+    def percentil(self, p: float) -> float:
+        """Cota superior (ms) del bucket que contiene el percentil p"""
+        if self.total == 0:
+            return 0.0
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return BUCKETS_LATENCIA_MS[i] if i < len(BUCKETS_LATENCIA_MS) else self.maximo_ms
+        return self.maximo_ms
+
+    def resumen(self) -> str:
+        promedio = self.suma_ms / self.total if self.total else 0.0
+        return (f"{self.total} peticiones, {self.errores} errores, promedio {promedio:.0f} ms, "
+                f"p50 <= {self.percentil(50):.0f} ms, p95 <= {self.percentil(95):.0f} ms, "
+                f"máx {self.maximo_ms:.0f} ms")
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP compartido para Nominatim y OSRM.
+
+    Usa un pool keep-alive dimensionado al número de hilos, reintentos con
+    backoff exponencial ante 429/5xx (respetando Retry-After) y registra un
+    histograma de latencias por endpoint.
+
+    Los reintentos se hacen aquí y no en el adaptador de urllib3: con un
+    limitador (limitador_peticiones), cada intento, incluidos los reintentos,
+    espera su turno, así un reintento nunca rebasa el rate limit del servidor.
+    """
+
+    def __init__(self, tamano_pool: int = 10, reintentos: int = 3, backoff: float = 0.5,
+                 timeout: float = 15, headers: Optional[Dict[str, str]] = None, limitador=None):
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.limitador = limitador
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, tamano_pool),
+                                max_retries=0, pool_block=True)
+        self.session.mount('http://', adaptador)
+        self.session.mount('https://', adaptador)
+
+        self.latencias: Dict[str, HistogramaLatencias] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, endpoint: str, latencia_ms: float, error: bool):
+        with self._lock:
+            if endpoint not in self.latencias:
+                self.latencias[endpoint] = HistogramaLatencias()
+            self.latencias[endpoint].registrar(latencia_ms, error)
+
+    def _espera_reintento(self, intento: int, respuesta: Optional[requests.Response] = None) -> float:
+        """Segundos antes del siguiente intento: Retry-After si el servidor lo da, si no backoff exponencial"""
+        if respuesta is not None:
+            retry_after = respuesta.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** intento)
+
+    def get(self, url: str, params: dict = None, timeout: float = None,
+            endpoint: str = None) -> requests.Response:
+        """GET con reintentos; la latencia (incluyendo reintentos) se registra por endpoint"""
+        if endpoint is None:
+            endpoint = urlparse(url).netloc
+        inicio = time.perf_counter()
+        error = True
+        try:
+            for intento in range(self.reintentos + 1):
+                # Cada intento (también los reintentos) pasa por el rate limit
+                if self.limitador is not None:
+                    self.limitador.esperar()
+                try:
+                    respuesta = self.session.get(url, params=params, timeout=timeout or self.timeout)
+                except (requests.ConnectionError, requests.Timeout):
+                    if intento == self.reintentos:
+                        raise
+                    time.sleep(self._espera_reintento(intento))
+                    continue
+                if respuesta.status_code not in ESTADOS_REINTENTABLES or intento == self.reintentos:
+                    error = respuesta.status_code >= 400
+                    return respuesta
+                time.sleep(self._espera_reintento(intento, respuesta))
+                respuesta.close()
+        finally:
+            self._registrar(endpoint, (time.perf_counter() - inicio) * 1000, error)
+
+    def resumen_latencias(self) -> str:
+        """Resumen legible de las latencias por endpoint"""
+        with self._lock:
+            if not self.latencias:
+                return "Sin peticiones HTTP registradas"
+            return '\n'.join(f"   {endpoint}: {histograma.resumen()}"
+                             for endpoint, histograma in sorted(self.latencias.items()))
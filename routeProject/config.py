@@ -2,12 +2,75 @@
 # Configuración de servicios OSM
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 OSRM_URL = "http://router.project-osrm.org/route/v1/driving"
+OSRM_TABLE_URL = "http://router.project-osrm.org/table/v1/driving"
 STATIC_MAP_URL = "https://staticmap.openstreetmap.de/staticmap.php"
 
 # Configuración de geocodificación
 GEOCODING_BATCH_SIZE = 50
 GEOCODING_DELAY = 1.0  # OSM pide 1 segundo entre requests
+# Rate limit: 'estricto' (GEOCODING_DELAY entre requests), 'token_bucket' (Nominatim propio)
+# o 'auto' (estricto solo contra nominatim.openstreetmap.org)
+GEOCODING_RATE_MODE = "auto"
+GEOCODING_RATE = 20.0  # Requests por segundo sostenidas en modo token_bucket
+GEOCODING_BURST = 10  # Ráfaga máxima en modo token_bucket
+GEOCODING_WORKERS = 8  # Hilos de geocodificación (en modo estricto se usa 1)
 USER_AGENT = "OptimizadorRutas/1.0 (milagros.115295@gmail.com)"  # Required by Nominatim
 
+# Cliente HTTP compartido (Nominatim y OSRM)
+HTTP_REINTENTOS = 3  # Reintentos ante 429/5xx y errores de conexión
+HTTP_BACKOFF = 0.5  # Backoff exponencial: 0.5s, 1s, 2s...
+HTTP_TIMEOUT = 15  # Segundos por petición
+
+# Coordenadas proyectadas (metros UTM) en las columnas Latitud/Longitud
+UTM_ZONA = 13  # Jalisco
+UTM_HEMISFERIO_NORTE = True
+
 # Configuración de optimización
-DEPOT_INDEX = 0
\ No newline at end of file
+DEPOT_INDEX = 0
+# Modo disperso: solo los k vecinos más cercanos de cada parada tienen costo real (None = denso)
+OPTIMIZACION_VECINOS_K = None
+# Reparto de cuentas entre notificadores: "hilbert" (grupos compactos) u "orden" (orden del archivo)
+PARTICION_NOTIFICADORES = "hilbert"
+# Centro para detectar puntos lejanos: "media", "mediana" (robusta) o "medoide"
+PUNTOS_LEJANOS_CENTRO = "mediana"
+# Límite de tiempo del solver por ruta (segundos)
+OPTIMIZACION_TIEMPO_LIMITE = 30
+# Presupuesto adaptativo: segundos por parada, acotado entre el mínimo y el límite
+OPTIMIZACION_TIEMPO_MINIMO = 1
+OPTIMIZACION_SEGUNDOS_POR_PUNTO = 0.05
+# Detener la búsqueda si no mejora durante esta fracción del presupuesto
+OPTIMIZACION_ESTANCAMIENTO = 0.2
+# Hasta cuántos puntos se resuelve sin OR-Tools (Held-Karp exacto hasta 12, luego 2-opt/Or-opt)
+OPTIMIZACION_TSP_RAPIDO_MAX = 25
+# CSV donde registrar la evolución del objetivo de cada solve (None = no registrar)
+OPTIMIZACION_HISTORIAL_PATH = None
+# Procesos para resolver en paralelo las rutas de cada notificador (None = todos los núcleos)
+OPTIMIZACION_PROCESOS = None
+
+# Configuración de matrices de tiempos
+MATRICES_DIR = "datos/salida/matrices"
+# Caché columnar de los archivos de entrada ya parseados
+CACHE_TABLAS_DIR = "datos/cache"
+MATRIZ_UMBRAL_DISCO = 2000  # A partir de cuántos puntos la matriz se construye en disco (memmap)
+MATRIZ_TAMANO_BLOQUE = 512  # Filas por bloque al construir la matriz
+OSRM_TAMANO_BLOQUE = 50  # Orígenes/destinos por petición /table (respetar max-table-size del servidor)
+OSRM_WORKERS = 4  # Peticiones /table simultáneas
+
+# Caché persistente de tiempos OSRM por par de coordenadas
+TIEMPOS_CACHE_PATH = "datos/salida/cache_tiempos.sqlite"
+TIEMPOS_CACHE_MAX_ENTRADAS = 2000000  # Pares; se eliminan los usados hace más tiempo (LRU)
+TIEMPOS_CACHE_DECIMALES = 5  # Redondeo de lat/lon para la clave (~1 m)
+
+# Caché persistente de geocodificación
+GEOCODING_CACHE_PATH = "datos/salida/cache_geocodificacion.sqlite"
+GEOCODING_CACHE_TTL_DIAS = 90  # Días antes de volver a consultar una dirección
+GEOCODING_CACHE_MAX_ENTRADAS = 200000  # Se eliminan las menos usadas al exceder este tamaño
+GEOCODING_CACHE_NEGATIVO_TTL_DIAS = 7  # Días antes de reintentar una consulta sin resultado
+# Memo en memoria de textos ya limpiados (limpiador de CSV y geocodificador)
+LIMPIEZA_MEMO_MAX_ENTRADAS = 100000
+# Bitácora para reanudar geocodificaciones interrumpidas (se borra al terminar)
+GEOCODING_JOURNAL_DIR = "datos/salida"
+# Plan por dirección: caché (con negativos) -> una consulta a Nominatim (estructurada; texto libre si no hay número) -> centroide local
+# de colonia/CP. True = probar el centroide antes que la caché y la red (más rápido, menos preciso)
+GEOCODING_CENTROIDE_PRIMERO = False
+GEOCODING_CENTROIDES_PATH = "datos/entrada/centroides.csv"  # Se genera con centroides.py
@@ -0,0 +1,149 @@
+# routeProject/distancias.py
+import numpy as np
+from typing import Optional
+
+# Radio de la Tierra en km
+RADIO_TIERRA_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2, dtype=np.float64) -> np.ndarray:
+    """Distancia haversine en km con broadcasting de NumPy (grados de entrada)"""
+    lat1 = np.radians(np.asarray(lat1, dtype=dtype))
+    lon1 = np.radians(np.asarray(lon1, dtype=dtype))
+    lat2 = np.radians(np.asarray(lat2, dtype=dtype))
+    lon2 = np.radians(np.asarray(lon2, dtype=dtype))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    # Evitar valores fuera de [0, 1] por redondeo antes de la raíz
+    a = np.clip(a, 0, 1)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return (RADIO_TIERRA_KM * c).astype(dtype, copy=False)
+
+
+def bloque_tiempos_haversine(lats_filas: np.ndarray, lons_filas: np.ndarray,
+                             lats: np.ndarray, lons: np.ndarray,
+                             velocidad_kmh: float = 40.0, minimo_minutos: int = 1,
+                             dtype=np.float64) -> np.ndarray:
+    """Calcula un bloque de filas de la matriz de tiempos (minutos enteros)"""
+    distancias = haversine_km(lats_filas[:, None], lons_filas[:, None],
+                              lats[None, :], lons[None, :], dtype=dtype)
+
+    # Convertir distancia a tiempo (truncado, igual que int())
+    minutos = (distancias / velocidad_kmh) * 60
+    bloque = minutos.astype(np.int32)
+    np.maximum(bloque, minimo_minutos, out=bloque)
+    return bloque
+
+
+def matriz_tiempos_haversine(lats, lons, velocidad_kmh: float = 40.0,
+                             minimo_minutos: int = 1, dtype=np.float64,
+                             tamano_bloque: int = 1024,
+                             salida: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Matriz n x n de tiempos en minutos (int32) a partir de distancias haversine.
+
+    Se calcula por bloques de filas para que la memoria temporal dependa de
+    tamano_bloque x n y no de n². Con dtype=np.float32 los temporales ocupan la
+    mitad. La diagonal es 0 y el resto tiene como mínimo minimo_minutos.
+    """
+    lats = np.asarray(lats, dtype=dtype)
+    lons = np.asarray(lons, dtype=dtype)
+    n = len(lats)
+
+    if salida is None:
+        salida = np.empty((n, n), dtype=np.int32)
+
+    for inicio in range(0, n, tamano_bloque):
+        fin = min(inicio + tamano_bloque, n)
+        bloque = bloque_tiempos_haversine(lats[inicio:fin], lons[inicio:fin], lats, lons,
+                                          velocidad_kmh, minimo_minutos, dtype)
+        # Diagonal en cero (sin costo de un punto a sí mismo)
+        filas = np.arange(fin - inicio)
+        bloque[filas, filas + inicio] = 0
+        salida[inicio:fin] = bloque
+
+    return salida
+
+
+def vecinos_cercanos(lats, lons, k: int, tamano_bloque: int = 1024) -> np.ndarray:
+    """
+    Índices de los k vecinos más cercanos de cada punto (sin incluirse a sí mismo).
+
+    Usa un KD-tree de scipy sobre una proyección equirectangular local si está
+    instalado; si no, calcula por bloques con haversine y argpartition.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.zeros((n, 0), dtype=np.int64)
+
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        cKDTree = None
+
+    if cKDTree is not None:
+        # Proyección local en km (suficiente para ordenar vecinos dentro de una zona)
+        lat0 = np.radians(lats.mean())
+        puntos = np.column_stack((np.radians(lons) * np.cos(lat0), np.radians(lats))) * RADIO_TIERRA_KM
+        _, indices = cKDTree(puntos).query(puntos, k=k + 1)
+        vecinos = np.empty((n, k), dtype=np.int64)
+        for i, fila in enumerate(indices):
+            # Quitar el propio punto (puede no venir primero si hay coordenadas repetidas)
+            fila = fila[fila != i]
+            vecinos[i] = fila[:k]
+        return vecinos
+
+    vecinos = np.empty((n, k), dtype=np.int64)
+    for inicio in range(0, n, tamano_bloque):
+        fin = min(inicio + tamano_bloque, n)
+        distancias = haversine_km(lats[inicio:fin, None], lons[inicio:fin, None], lats[None, :], lons[None, :])
+        filas = np.arange(fin - inicio)
+        distancias[filas, filas + inicio] = np.inf
+        cercanos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        # Ordenar los k vecinos por distancia
+        orden = np.argsort(np.take_along_axis(distancias, cercanos, axis=1), axis=1)
+        vecinos[inicio:fin] = np.take_along_axis(cercanos, orden, axis=1)
+    return vecinos
+
+
+def indice_hilbert(lats, lons, orden: int = 16) -> np.ndarray:
+    """
+    Posición de cada punto sobre una curva de Hilbert de 2^orden x 2^orden celdas.
+
+    Puntos cercanos en la curva son cercanos en el mapa, así que cortar el orden
+    de la curva en tramos consecutivos produce grupos compactos y balanceados.
+    La longitud se escala por cos(latitud) para que la cuadrícula sea isotrópica.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if len(lats) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    y = lats - lats.min()
+    x = (lons - lons.min()) * np.cos(np.radians(lats.mean()))
+    lado = max(x.max(), y.max()) or 1.0
+    celdas = (1 << orden) - 1
+    x = np.rint(x / lado * celdas).astype(np.int64)
+    y = np.rint(y / lado * celdas).astype(np.int64)
+
+    indice = np.zeros(len(x), dtype=np.int64)
+    s = 1 << (orden - 1)
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        indice += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotar el cuadrante para que la curva sea continua
+        voltear = ~ry & rx
+        x[voltear] = celdas - x[voltear]
+        y[voltear] = celdas - y[voltear]
+        intercambiar = ~ry
+        x[intercambiar], y[intercambiar] = y[intercambiar], x[intercambiar]
+        s >>= 1
+    return indice
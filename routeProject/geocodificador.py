@@ -1,9 +1,19 @@
+import os
 import pandas as pd
-import requests
-import time
 import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple, Optional
 from math import radians, sin, cos, sqrt, atan2
+from cache_geocodificacion import CacheGeocodificacion
+from limitador_peticiones import LimitadorEstricto, crear_limitador
+from cliente_http import ClienteHTTP
+from proyecciones import reproyectar_columnas
+from cargador import cargar_tabla
+from memo_limpieza import MEMO_LIMPIEZA
+from journal_geocodificacion import JournalGeocodificacion
+from centroides import TablaCentroides, normalizar_cp
 
 try:
     from config import NOMINATIM_URL, GEOCODING_DELAY, USER_AGENT
@@ -12,10 +22,77 @@ except ImportError:
     GEOCODING_DELAY = 1.0
     USER_AGENT = "OptimizadorRutas/1.0"
 
+try:
+    from config import GEOCODING_CACHE_PATH, GEOCODING_CACHE_TTL_DIAS, GEOCODING_CACHE_MAX_ENTRADAS
+except ImportError:
+    GEOCODING_CACHE_PATH = "datos/salida/cache_geocodificacion.sqlite"
+    GEOCODING_CACHE_TTL_DIAS = 90
+    GEOCODING_CACHE_MAX_ENTRADAS = 200000
+
+try:
+    from config import GEOCODING_RATE_MODE, GEOCODING_RATE, GEOCODING_BURST, GEOCODING_WORKERS
+except ImportError:
+    GEOCODING_RATE_MODE = "auto"
+    GEOCODING_RATE = 20.0
+    GEOCODING_BURST = 10
+    GEOCODING_WORKERS = 8
+
+try:
+    from config import HTTP_REINTENTOS, HTTP_BACKOFF, HTTP_TIMEOUT
+except ImportError:
+    HTTP_REINTENTOS = 3
+    HTTP_BACKOFF = 0.5
+    HTTP_TIMEOUT = 15
+
+try:
+    from config import UTM_ZONA, UTM_HEMISFERIO_NORTE
+except ImportError:
+    UTM_ZONA = 13
+    UTM_HEMISFERIO_NORTE = True
+
+try:
+    from config import GEOCODING_JOURNAL_DIR
+except ImportError:
+    GEOCODING_JOURNAL_DIR = "datos/salida"
+
+try:
+    from config import GEOCODING_CACHE_NEGATIVO_TTL_DIAS
+except ImportError:
+    GEOCODING_CACHE_NEGATIVO_TTL_DIAS = 7
+
+try:
+    from config import GEOCODING_CENTROIDE_PRIMERO
+except ImportError:
+    GEOCODING_CENTROIDE_PRIMERO = False
+
 class Geocodificador:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': USER_AGENT})
+    def __init__(self, usar_cache: bool = True):
+        # Caché persistente: un acierto no genera petición ni espera
+        self.cache = None
+        if usar_cache:
+            self.cache = CacheGeocodificacion(GEOCODING_CACHE_PATH, GEOCODING_CACHE_TTL_DIAS,
+                                              GEOCODING_CACHE_MAX_ENTRADAS, GEOCODING_CACHE_NEGATIVO_TTL_DIAS)
+        
+        # Centroides locales de colonia/CP: ubican una dirección sin petición
+        self.centroides = TablaCentroides()
+        if len(self.centroides):
+            print(f"Tabla de centroides: {len(self.centroides)} colonias/CP ({self.centroides.ruta})")
+        
+        # Cómo se resolvió cada dirección (caché, red, centroide...), para el resumen
+        self.plan = Counter()
+        self._lock_plan = threading.Lock()
+        
+        # Política de rate limit compartida por todos los hilos de geocodificación
+        self.limitador = crear_limitador(GEOCODING_RATE_MODE, NOMINATIM_URL, GEOCODING_DELAY,
+                                         GEOCODING_RATE, GEOCODING_BURST)
+        # Con la política estricta (Nominatim público) no tiene sentido paralelizar
+        self.max_workers = 1 if isinstance(self.limitador, LimitadorEstricto) else max(1, GEOCODING_WORKERS)
+        
+        # Pool keep-alive del tamaño del número de hilos, con reintentos ante 429/5xx;
+        # el cliente pide turno al limitador antes de cada intento (reintentos incluidos)
+        self.http = ClienteHTTP(tamano_pool=self.max_workers, reintentos=HTTP_REINTENTOS,
+                                backoff=HTTP_BACKOFF, timeout=HTTP_TIMEOUT,
+                                headers={'User-Agent': USER_AGENT}, limitador=self.limitador)
         
         # Centros de zonas predefinidos (zonas predefinidas para pensiones)
         self.centros_zonas = {
@@ -25,6 +102,16 @@ class Geocodificador:
             'tlaquepaque': (20.6333, -103.3167),
             'tlajomulco': (20.4667, -103.4333)
         }
+        
+        # Municipio (ciudad para Nominatim) de las zonas que llevan su nombre; las
+        # demás zonas son áreas de reparto y no se envían como ciudad
+        self.municipios_zonas = {
+            'guadalajara': 'Guadalajara',
+            'zapopan': 'Zapopan',
+            'tonala': 'Tonalá',
+            'tlaquepaque': 'San Pedro Tlaquepaque',
+            'tlajomulco': 'Tlajomulco de Zúñiga'
+        }
     
     def _calcular_distancia_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calcula distancia en km usando fórmula haversine"""
@@ -82,6 +169,14 @@ class Geocodificador:
             df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
             df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
             
+            # Coordenadas en metros UTM: convertir a grados en bloque, sin red
+            lat, lon, convertidas = reproyectar_columnas(df['lat'], df['lon'], UTM_ZONA, UTM_HEMISFERIO_NORTE)
+            if convertidas:
+                hemisferio = 'N' if UTM_HEMISFERIO_NORTE else 'S'
+                print(f"{convertidas} coordenadas UTM (zona {UTM_ZONA}{hemisferio}) convertidas a lat/lon")
+                df['lat'] = lat
+                df['lon'] = lon
+            
             # Filtrar coordenadas inválidas
             mask_validas = (
                 df['lat'].notna() & 
@@ -97,7 +192,10 @@ class Geocodificador:
     def limpiar_direccion(self, direccion: str) -> str:
         if pd.isna(direccion):
             return ""
-        
+        # Las direcciones se repiten entre filas: cada texto distinto se limpia una vez
+        return MEMO_LIMPIEZA.limpiar('direccion', self._limpiar_direccion, direccion)
+    
+    def _limpiar_direccion(self, direccion: str) -> str:
         # Limpieza básica
         direccion_limpia = direccion.strip().title()
         
@@ -128,120 +226,241 @@ class Geocodificador:
     def limpiar_campo(self, texto) -> str:
         if pd.isna(texto):
             return ""
-        texto = str(texto).strip().title()
+        # Colonia y Zona tienen pocos valores distintos: se limpian una vez cada uno
+        return MEMO_LIMPIEZA.limpiar('geocodificador', self._limpiar_campo, str(texto))
+    
+    def _limpiar_campo(self, texto: str) -> str:
+        texto = texto.strip().title()
         texto = re.sub(r'\s+', ' ', texto)
         return texto
     
+    def _construir_query(self, direccion_limpia: str, colonia: str = None, cp: str = None, zona: str = None) -> str:
+        """Construye la consulta en formato MEXICANO para OSM"""
+        query_partes = []
+        
+        # 1. Primero la dirección principal
+        query_partes.append(direccion_limpia)
+        
+        # 2. Luego la colonia (si existe)
+        if colonia and pd.notna(colonia) and str(colonia).strip():
+            colonia_limpia = self.limpiar_campo(colonia)
+            query_partes.append(colonia_limpia)
+        
+        # 3. Usar la ZONA como ciudad (excepto si es "Foráneos")
+        if zona and pd.notna(zona) and str(zona).strip().lower() != "foráneos":
+            zona_limpia = self.limpiar_campo(zona)
+            query_partes.append(zona_limpia)
+        else:
+            # Si es Foráneos o no hay zona, usar estado directamente
+            query_partes.append("Jalisco")
+        
+        # 4. Estado (si no se usó la zona como ciudad)
+        if not zona or str(zona).strip().lower() == "foráneos":
+            query_partes.append("Jalisco")
+        
+        # 5. CP (si existe) - al final
+        if cp and pd.notna(cp) and str(cp).strip():
+            cp_limpio = str(cp).strip()
+            query_partes.append(cp_limpio)
+        
+        # 6. País
+        query_partes.append("México")
+        
+        return ', '.join([parte for parte in query_partes if parte])
+    
+    def _clave_cache(self, query: str, zona: str = None) -> str:
+        """Clave normalizada de la consulta (la zona decide el veredicto de radio)"""
+        zona_clave = zona if zona is not None and pd.notna(zona) else None
+        return CacheGeocodificacion.normalizar_clave(query, zona_clave)
+    
+    def _resultado_con_radio(self, item: dict, zona: str, clave: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        """Aplica el filtro de radio a un resultado de Nominatim y lo guarda en caché"""
+        lat = float(item['lat'])
+        lon = float(item['lon'])
+        display_name = item['display_name']
+        
+        # Verificar distancia (25km máximo)
+        dentro_radio, distancia = self._esta_dentro_radio_permitido(lat, lon, zona)
+        if not dentro_radio:
+            print(f"Coordenada fuera de radio: {distancia:.1f} km de centro de {zona}")
+            mensaje = f"NO LOCALIZABLE - Fuera de radio ({distancia:.1f} km)"
+            if self.cache is not None:
+                self.cache.guardar(clave, lat, lon, mensaje, fuera_radio=True)
+            return None, None, mensaje
+        
+        if self.cache is not None:
+            self.cache.guardar(clave, lat, lon, display_name)
+        return lat, lon, display_name
+    
+    def _municipio_de_zona(self, zona: str = None) -> Optional[str]:
+        """Municipio de la zona si su nombre lo contiene (las zonas de reparto no son ciudades)"""
+        if not zona or pd.isna(zona):
+            return None
+        zona_limpia = self.limpiar_campo(zona).lower()
+        for nombre_zona, municipio in self.municipios_zonas.items():
+            if nombre_zona in zona_limpia:
+                return municipio
+        return None
+    
+    def _parametros_estructurados(self, direccion_limpia: str, colonia: str = None, cp: str = None, zona: str = None) -> Optional[dict]:
+        """
+        Consulta estructurada de Nominatim: calle, municipio, CP, estado y país.
+        
+        La ciudad solo se envía si la zona corresponde a un municipio conocido, y
+        el CP solo si es de Jalisco (44000-49999): Nominatim lo usa como filtro y
+        un CP de otro estado es un error de captura. Devuelve None si la
+        dirección no tiene número (no hay calle y número que separar).
+        """
+        if not re.search(r'\d', direccion_limpia):
+            return None
+        
+        params = {
+            'street': direccion_limpia,
+            'state': 'Jalisco',
+            'country': 'México',
+            'format': 'json',
+            'limit': 1,
+            'countrycodes': 'mx',
+            'addressdetails': 1
+        }
+        
+        municipio = self._municipio_de_zona(zona)
+        if municipio:
+            params['city'] = municipio
+        
+        cp_limpio = normalizar_cp(cp)
+        if '44000' <= cp_limpio <= '49999':
+            params['postalcode'] = cp_limpio
+        
+        return params
+    
+    def _parametros_texto(self, direccion_limpia: str, colonia: str = None, cp: str = None, zona: str = None) -> dict:
+        """Consulta de texto libre (sin número que estructurar): calle, colonia, municipio, CP y país"""
+        query_partes = [direccion_limpia]
+        if colonia and pd.notna(colonia) and str(colonia).strip():
+            query_partes.append(self.limpiar_campo(colonia))
+        municipio = self._municipio_de_zona(zona)
+        if municipio:
+            query_partes.append(municipio)
+        query_partes.append('Jalisco')
+        cp_limpio = normalizar_cp(cp)
+        if cp_limpio:
+            query_partes.append(cp_limpio)
+        query_partes.append('México')
+        
+        return {
+            'q': ', '.join(parte for parte in query_partes if parte),
+            'format': 'json',
+            'limit': 1,
+            'countrycodes': 'mx',
+            'addressdetails': 1
+        }
+    
+    def _consultar_nominatim(self, params: dict) -> list:
+        """Una petición a Nominatim (el cliente HTTP respeta el rate limit)"""
+        self._contar('peticiones')
+        response = self.http.get(NOMINATIM_URL, params=params, endpoint='nominatim')
+        response.raise_for_status()
+        return response.json()
+    
+    def _contar(self, paso: str):
+        with self._lock_plan:
+            self.plan[paso] += 1
+    
+    def _buscar_centroide(self, colonia: str = None, cp: str = None, zona: str = None) -> Optional[Tuple[float, float, str]]:
+        """Centroide local de la colonia o CP, si existe y está dentro del radio de la zona"""
+        encontrado = self.centroides.buscar(colonia, cp, zona)
+        if encontrado is None:
+            return None
+        
+        lat, lon, descripcion = encontrado
+        dentro_radio, _ = self._esta_dentro_radio_permitido(lat, lon, zona)
+        if not dentro_radio:
+            return None
+        
+        print(f"Ubicada por {descripcion}")
+        self._contar('centroide')
+        return lat, lon, descripcion
+    
+    def _sin_resultado(self, colonia: str = None, cp: str = None, zona: str = None) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        """Último recurso sin red: el centroide (si no se probó ya antes de la caché)"""
+        if not GEOCODING_CENTROIDE_PRIMERO:
+            centroide = self._buscar_centroide(colonia, cp, zona)
+            if centroide is not None:
+                return centroide
+        self._contar('sin_resultado')
+        return None, None, None
+    
     def geocodificar_direccion(self, direccion: str, colonia: str = None, cp: str = None, zona: str = None) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        """
+        Ubica una dirección con a lo más una petición a Nominatim.
+        
+        Orden: caché (también los negativos) -> una consulta a Nominatim ->
+        centroide local de colonia/CP. La consulta es estructurada (calle,
+        municipio, CP); solo si la dirección no tiene número se envía en texto
+        libre con la colonia. Con GEOCODING_CENTROIDE_PRIMERO el centroide se
+        prueba antes que todo lo demás. Un centroide se devuelve con la descripción
+        'CENTROIDE de ...'; procesar_csv lo marca como 'aproximado', lo rutea y
+        lo lista también en el reporte de problemas.
+        """
         direccion_limpia = self.limpiar_direccion(direccion)
         
         if not direccion_limpia:
             return None, None, None
         
         try:
-            # Construir query en formato MEXICANO para OSM
-            query_partes = []
-            
-            # 1. Primero la dirección principal
-            query_partes.append(direccion_limpia)
-            
-            # 2. Luego la colonia (si existe)
-            if colonia and pd.notna(colonia) and str(colonia).strip():
-                colonia_limpia = self.limpiar_campo(colonia)
-                query_partes.append(colonia_limpia)
-            
-            # 3. Usar la ZONA como ciudad (excepto si es "Foráneos")
-            if zona and pd.notna(zona) and str(zona).strip().lower() != "foráneos":
-                zona_limpia = self.limpiar_campo(zona)
-                query_partes.append(zona_limpia)
-            else:
-                # Si es Foráneos o no hay zona, usar estado directamente
-                query_partes.append("Jalisco")
-            
-            # 4. Estado (si no se usó la zona como ciudad)
-            if not zona or str(zona).strip().lower() == "foráneos":
-                query_partes.append("Jalisco")
-            
-            # 5. CP (si existe) - al final
-            if cp and pd.notna(cp) and str(cp).strip():
-                cp_limpio = str(cp).strip()
-                query_partes.append(cp_limpio)
-            
-            # 6. País
-            query_partes.append("México")
-            
-            query_completa = ', '.join([parte for parte in query_partes if parte])
+            query_completa = self._construir_query(direccion_limpia, colonia, cp, zona)
+            clave = self._clave_cache(query_completa, zona)
+            
+            if GEOCODING_CENTROIDE_PRIMERO:
+                centroide = self._buscar_centroide(colonia, cp, zona)
+                if centroide is not None:
+                    return centroide
+            
+            # Un acierto en caché no hace petición ni espera por rate limit
+            if self.cache is not None:
+                en_cache = self.cache.obtener(clave)
+                if en_cache == (None, None, None):
+                    print(f"Sin resultado (en caché): {query_completa}")
+                    self._contar('cache_negativa')
+                    return self._sin_resultado(colonia, cp, zona)
+                if en_cache is not None:
+                    print(f"En caché: {query_completa}")
+                    self._contar('cache')
+                    return en_cache
             
             print(f"Buscando: {query_completa}")
             
-            params = {
-                'q': query_completa,
-                'format': 'json',
-                'limit': 1,
-                'countrycodes': 'mx',
-                'addressdetails': 1
-            }
-            
-            response = self.session.get(NOMINATIM_URL, params=params, timeout=15)
-            response.raise_for_status()
-            
-            data = response.json()
+            params = self._parametros_estructurados(direccion_limpia, colonia, cp, zona)
+            if params is None:
+                # Sin número no hay calle que estructurar: texto libre con la colonia
+                params = self._parametros_texto(direccion_limpia, colonia, cp, zona)
+            data = self._consultar_nominatim(params)
             
             if data:
-                lat = float(data[0]['lat'])
-                lon = float(data[0]['lon'])
-                display_name = data[0]['display_name']
                 tipo = data[0].get('type', 'desconocido')
-                
-                print(f"Encontrado: {display_name} (tipo: {tipo})")
-                
-                # Verificar distancia (25km máximo)
-                dentro_radio, distancia = self._esta_dentro_radio_permitido(lat, lon, zona)
-                if not dentro_radio:
-                    print(f"Coordenada fuera de radio: {distancia:.1f} km de centro de {zona}")
-                    return None, None, f"NO LOCALIZABLE - Fuera de radio ({distancia:.1f} km)"
-                
-                return lat, lon, display_name
-            else:
-                print(f"No se pudo geocodificar: {query_completa}")
-                
-                # Intentar versión más simple (usando zona como ciudad)
-                if zona and str(zona).strip().lower() != "foráneos":
-                    query_simple = f"{direccion_limpia}, {zona}, Jalisco, México"
-                else:
-                    query_simple = f"{direccion_limpia}, Jalisco, México"
-                
-                print(f"Intentando versión simple: {query_simple}")
-                
-                params_simple = {
-                    'q': query_simple,
-                    'format': 'json',
-                    'limit': 1,
-                    'countrycodes': 'mx'
-                }
-                
-                response_simple = self.session.get(NOMINATIM_URL, params=params_simple, timeout=15)
-                data_simple = response_simple.json()
-                
-                if data_simple:
-                    lat = float(data_simple[0]['lat'])
-                    lon = float(data_simple[0]['lon'])
-                    display_name = data_simple[0]['display_name']
-                    print(f"Encontrado con versión simple: {display_name}")
-                    
-                    # Verificar distancia también para versión simple
-                    dentro_radio, distancia = self._esta_dentro_radio_permitido(lat, lon, zona)
-                    if not dentro_radio:
-                        print(f"Coordenada fuera de radio: {distancia:.1f} km de centro de {zona}")
-                        return None, None, f"NO LOCALIZABLE - Fuera de radio ({distancia:.1f} km)"
-                    
-                    return lat, lon, display_name
-                
-                return None, None, None
-                    
+                print(f"Encontrado: {data[0]['display_name']} (tipo: {tipo})")
+                self._contar('red')
+                return self._resultado_con_radio(data[0], zona, clave)
+            
+            # Sin resultado: se recuerda para no gastar otra petición en la próxima corrida
+            print(f"No se pudo geocodificar: {query_completa}")
+            if self.cache is not None:
+                self.cache.guardar_negativo(clave)
+        
         except Exception as e:
+            # Un error de red no es un "no encontrado": no se guarda ni se usa el centroide
             print(f"Error geocodificando '{direccion}': {e}")
             return None, None, None
+        
+        return self._sin_resultado(colonia, cp, zona)
+    
+    def resumen_plan(self) -> str:
+        """Cómo se resolvieron las direcciones de la corrida"""
+        with self._lock_plan:
+            plan = dict(self.plan)
+        pasos = ('cache', 'cache_negativa', 'red', 'centroide', 'sin_resultado', 'peticiones')
+        return "Plan de geocodificación: " + ", ".join(f"{paso}={plan.get(paso, 0)}" for paso in pasos)
     
     def geocodificar_punto_inicial(self, direccion: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
         """Geocodifica una dirección para punto inicial (sin filtro de zona)"""
@@ -256,7 +475,7 @@ class Geocodificador:
                 'countrycodes': 'mx'
             }
             
-            response = self.session.get(NOMINATIM_URL, params=params, timeout=15)
+            response = self.http.get(NOMINATIM_URL, params=params, endpoint='nominatim')
             response.raise_for_status()
             
             data = response.json()
@@ -276,9 +495,14 @@ class Geocodificador:
             print(f"Error geocodificando punto inicial '{direccion}': {e}")
             return None, None, None
     
+    def journal_para(self, archivo_salida: str) -> JournalGeocodificacion:
+        """Bitácora de la corrida que escribe archivo_salida (una por archivo de salida)"""
+        nombre = os.path.splitext(os.path.basename(archivo_salida))[0]
+        return JournalGeocodificacion(os.path.join(GEOCODING_JOURNAL_DIR, f"journal_{nombre}.jsonl"))
+    
     def procesar_csv(self, archivo_entrada: str, archivo_salida: str) -> pd.DataFrame:
         print("Leyendo archivo CSV...")
-        df = pd.read_csv(archivo_entrada)
+        df = cargar_tabla(archivo_entrada)
         
         # Estandarizar nombres de columnas
         df.columns = df.columns.str.strip().str.title()
@@ -317,26 +541,22 @@ class Geocodificador:
         
         print("Limpiando y geocodificando direcciones...")
         
-        resultados = []
-        for i, fila in df.iterrows():
-            if i > 0:
-                time.sleep(GEOCODING_DELAY)
-            
+        filas = []
+        for _, fila in df.iterrows():
             # Extraer información adicional
             colonia = fila['Colonia'] if tiene_colonia else None
             cp = fila['Cp'] if tiene_cp else None
             zona = fila['Zona'] if tiene_zona else None
             
-            resultado = self.geocodificar_direccion(fila['Domicilio'], colonia, cp, zona)
-            resultados.append(resultado)
-            
-            if i % 5 == 0 and i > 0:
-                print(f"Geocodificadas {i}/{len(df)} direcciones...")
+            filas.append((fila['Domicilio'], colonia, cp, zona))
+        
+        journal = self.journal_para(archivo_salida)
+        resultados = self._geocodificar_unicos(filas, journal)
         
         # Agregar resultados al DataFrame
         df[['lat', 'lon', 'domicilio_limpio']] = resultados
         
-        # Clasificar resultados en tres categorías
+        # Clasificar resultados en cuatro categorías
         df['estado_geocodificacion'] = 'exitoso'
         
         # 1. Fallos de geocodificación (coordenadas nulas)
@@ -347,11 +567,15 @@ class Geocodificador:
         mask_fuera_radio = df['domicilio_limpio'].str.contains('NO LOCALIZABLE', na=False)
         df.loc[mask_fuera_radio, 'estado_geocodificacion'] = 'fuera_radio'
         
-        # 3. Éxitos (el resto)
-        mask_exitosos = (~mask_fallos) & (~mask_fuera_radio)
+        # 3. Aproximados: centroide de colonia/CP, no la dirección exacta
+        mask_aproximados = (~mask_fallos) & df['domicilio_limpio'].str.startswith('CENTROIDE', na=False)
+        df.loc[mask_aproximados, 'estado_geocodificacion'] = 'aproximado'
+        
+        # 4. Éxitos (el resto)
+        mask_exitosos = (~mask_fallos) & (~mask_fuera_radio) & (~mask_aproximados)
         df.loc[mask_exitosos, 'estado_geocodificacion'] = 'exitoso'
         
-        # Guardar TODOS los fallos en un archivo unificado
+        # Guardar TODOS los fallos (y los aproximados, que sí se rutean) en un archivo unificado
         df_fallidos = df[df['estado_geocodificacion'] != 'exitoso'].copy()
         if not df_fallidos.empty:
             archivo_fallidos = archivo_salida.replace('.csv', '_fallidos.csv')
@@ -360,24 +584,32 @@ class Geocodificador:
             df_fallidos['razon_fallo'] = 'desconocida'
             df_fallidos.loc[df_fallidos['estado_geocodificacion'] == 'fallo_geocodificacion', 'razon_fallo'] = 'No se pudo geocodificar'
             df_fallidos.loc[df_fallidos['estado_geocodificacion'] == 'fuera_radio', 'razon_fallo'] = 'Fuera del radio de 25km'  # 25km
+            df_fallidos.loc[df_fallidos['estado_geocodificacion'] == 'aproximado', 'razon_fallo'] = 'Ubicación aproximada (centroide de colonia/CP)'
             
             df_fallidos.to_csv(archivo_fallidos, index=False, encoding='utf-8')
-            print(f"{len(df_fallidos)} direcciones no localizables guardadas en: {archivo_fallidos}")
+            print(f"{len(df_fallidos)} direcciones con problemas guardadas en: {archivo_fallidos}")
             
             # Mostrar estadísticas
             fallos_geocodificacion = len(df_fallidos[df_fallidos['estado_geocodificacion'] == 'fallo_geocodificacion'])
             fuera_radio = len(df_fallidos[df_fallidos['estado_geocodificacion'] == 'fuera_radio'])
+            aproximados = len(df_fallidos[df_fallidos['estado_geocodificacion'] == 'aproximado'])
             
             print(f"   - {fallos_geocodificacion} fallos de geocodificación")
             print(f"   - {fuera_radio} direcciones fuera del radio permitido")
+            print(f"   - {aproximados} direcciones ubicadas solo por centroide de colonia/CP (se rutean marcadas)")
         
-        # Guardar solo los resultados exitosos
-        df_exitosos = df[df['estado_geocodificacion'] == 'exitoso'].copy()
+        # Guardar los resultados ruteables: exactos y aproximados (marcados en estado_geocodificacion)
+        df_exitosos = df[df['estado_geocodificacion'].isin(['exitoso', 'aproximado'])].copy()
         df_exitosos.to_csv(archivo_salida, index=False, encoding='utf-8')
+        num_aproximados = int((df_exitosos['estado_geocodificacion'] == 'aproximado').sum())
+        
+        # Las salidas ya están escritas: la bitácora deja de hacer falta
+        journal.eliminar()
         
         print(f"\nGeocodificación completada.")
-        print(f"   ✓ {len(df_exitosos)} direcciones válidas y dentro del radio")
-        print(f"   ✗ {len(df_fallidos)} direcciones con problemas")
+        print(f"   ✓ {len(df_exitosos)} direcciones válidas y dentro del radio "
+              f"({num_aproximados} aproximadas por centroide)")
+        print(f"   ✗ {len(df_fallidos) - num_aproximados} direcciones no localizables")
         print(f"   Tasa de éxito: {(len(df_exitosos)/len(df)*100):.1f}%")
         print(f"   Resultados válidos guardados en: {archivo_salida}")
         
@@ -387,12 +619,13 @@ class Geocodificador:
             print("   - Revisar las direcciones fallidas en el archivo de reporte")
             print("   - Para 'Fuera de radio': verificar que la zona sea correcta")
             print("   - Para 'No geocodificado': agregar Colonia o CP para mejor precisión")
+            print("   - Para 'Ubicación aproximada': corregir la calle y número o capturar la coordenada")
         
         return df_exitosos
 
     def procesar_csv_mixto(self, archivo_entrada: str, archivo_salida: str) -> pd.DataFrame:
         print("Procesando archivo de coordenadas mixtas...")
-        df = pd.read_csv(archivo_entrada)
+        df = cargar_tabla(archivo_entrada)
         df.columns = df.columns.str.strip().str.title()
         
         # Identificar registros CON coordenadas
@@ -416,9 +649,11 @@ class Geocodificador:
             df_con_coordenadas['domicilio_limpio'] = df_con_coordenadas.get('Domicilio', '')
         
         # 2. Geocodificar los que faltan
+        journal = None
         if not df_sin_coordenadas.empty:
             print("Geocodificando registros sin coordenadas...")
-            resultados_geocodificacion = self.geocodificar_lote(df_sin_coordenadas)
+            journal = self.journal_para(archivo_salida)
+            resultados_geocodificacion = self.geocodificar_lote(df_sin_coordenadas, journal)
             df_sin_coordenadas[['lat', 'lon', 'domicilio_limpio']] = resultados_geocodificacion
             df_sin_coordenadas['estado_geocodificacion'] = 'geocodificado'
         else:
@@ -429,18 +664,28 @@ class Geocodificador:
         
         # 4. Clasificar y guardar resultados
         self._guardar_resultados_mixtos(df_final, archivo_salida)
+        if journal is not None:
+            journal.eliminar()
         
         return df_final
 
     def _guardar_resultados_mixtos(self, df: pd.DataFrame, archivo_salida: str):
         """Guarda resultados del procesamiento mixto"""
+        # Los centroides de colonia/CP no son la dirección exacta: se rutean marcados
+        # y también se listan en el reporte de problemas
+        mask_aproximados = (
+            (df['estado_geocodificacion'] == 'geocodificado') &
+            df['domicilio_limpio'].astype(str).str.startswith('CENTROIDE')
+        )
+        df.loc[mask_aproximados, 'estado_geocodificacion'] = 'aproximado'
+        
         # Identificar fallos de geocodificación
         mask_fallos = (
             (df['estado_geocodificacion'] == 'geocodificado') & 
             (df['lat'].isna() | df['lon'].isna())
         )
         
-        df_fallidos = df[mask_fallos].copy()
+        df_fallidos = df[mask_fallos | mask_aproximados].copy()
         df_exitosos = df[~mask_fallos].copy()
         
         # Guardar resultados
@@ -449,13 +694,15 @@ class Geocodificador:
         if not df_fallidos.empty:
             archivo_fallidos = archivo_salida.replace('.csv', '_fallidos.csv')
             df_fallidos.to_csv(archivo_fallidos, index=False, encoding='utf-8')
-            print(f"{len(df_fallidos)} registros no se pudieron geocodificar")
+            print(f"{int(mask_fallos.sum())} registros no se pudieron geocodificar; "
+                  f"{int(mask_aproximados.sum())} aproximados por centroide se rutean marcados")
         
         print(f"Resultados guardados: {archivo_salida}")
 
 
-    def geocodificar_lote(self, df: pd.DataFrame) -> List[Tuple[Optional[float], Optional[float], Optional[str]]]:
-        resultados = []
+    def geocodificar_lote(self, df: pd.DataFrame,
+                          journal: Optional[JournalGeocodificacion] = None) -> List[Tuple[Optional[float], Optional[float], Optional[str]]]:
+        filas = []
         
         # Verificar columnas disponibles
         columnas = df.columns.str.lower().tolist()
@@ -471,10 +718,7 @@ class Geocodificador:
         if tiene_zona:
             print("Zona detectada")
         
-        for i, fila in df.iterrows():
-            if i > 0:
-                time.sleep(GEOCODING_DELAY)
-        
+        for _, fila in df.iterrows():
             # Extraer información adicional
             colonia = fila['Colonia'] if tiene_colonia and 'Colonia' in df.columns else None
             if not colonia and tiene_colonia:
@@ -497,10 +741,81 @@ class Geocodificador:
                         zona = fila[col]
                         break
             
-            resultado = self.geocodificar_direccion(fila['Domicilio'], colonia, cp, zona)
-            resultados.append(resultado)
-            
-            if i % 5 == 0 and i > 0:
-                print(f"Geocodificadas {i}/{len(df)} direcciones...")
+            filas.append((fila['Domicilio'], colonia, cp, zona))
+        
+        return self._geocodificar_unicos(filas, journal)
+    
+    def _geocodificar_unicos(self, filas: List[Tuple],
+                             journal: Optional[JournalGeocodificacion] = None) -> List[Tuple[Optional[float], Optional[float], Optional[str]]]:
+        """
+        Geocodifica cada dirección única una sola vez y replica el resultado a sus filas.
+        
+        Con bitácora, las direcciones que ya tiene se toman de ahí y cada resultado
+        nuevo se le agrega al llegar.
+        """
+        # Agrupar filas por clave normalizada de consulta (en orden de aparición)
+        grupos = {}
+        for posicion, (direccion, colonia, cp, zona) in enumerate(filas):
+            direccion_limpia = self.limpiar_direccion(direccion)
+            clave = None
+            if direccion_limpia:
+                clave = self._clave_cache(self._construir_query(direccion_limpia, colonia, cp, zona), zona)
+            grupos.setdefault(clave, []).append(posicion)
+        
+        claves_unicas = [clave for clave in grupos if clave is not None]
+        total_filas = len(filas)
+        if claves_unicas:
+            print(f"Deduplicación: {total_filas} filas -> {len(claves_unicas)} direcciones únicas "
+                  f"(ratio {total_filas / len(claves_unicas):.2f}x, "
+                  f"{(1 - len(claves_unicas) / total_filas) * 100:.1f}% consultas evitadas)")
+        
+        def geocodificar_clave(clave):
+            return self.geocodificar_direccion(*filas[grupos[clave][0]])
+        
+        resultados = [(None, None, None)] * total_filas
+        
+        # Direcciones que una corrida anterior ya dejó en la bitácora
+        previos = journal.cargar() if journal is not None else {}
+        pendientes = []
+        for clave in claves_unicas:
+            if clave in previos:
+                for posicion in grupos[clave]:
+                    resultados[posicion] = previos[clave]
+            else:
+                pendientes.append(clave)
+        if len(pendientes) < len(claves_unicas):
+            print(f"Reanudando: {len(claves_unicas) - len(pendientes)} direcciones ya geocodificadas "
+                  f"en {journal.ruta}, faltan {len(pendientes)}")
+        
+        if self.max_workers > 1:
+            print(f"Geocodificando con {self.max_workers} hilos...")
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futuros = {executor.submit(geocodificar_clave, clave): clave for clave in pendientes}
+            # Cada resultado va a la bitácora en cuanto llega, no al final de la corrida
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                clave = futuros[futuro]
+                resultado = futuro.result()
+                for posicion in grupos[clave]:
+                    resultados[posicion] = resultado
+                # Una falla total puede ser un error de red: no se registra para reintentarla
+                if journal is not None and resultado != (None, None, None):
+                    journal.agregar(clave, resultado)
+                
+                if i % 5 == 0:
+                    print(f"Geocodificadas {i}/{len(pendientes)} direcciones únicas...")
+        finally:
+            # Ante Ctrl-C no esperar las consultas que aún no empiezan
+            executor.shutdown(wait=True, cancel_futures=True)
+            if journal is not None:
+                journal.cerrar()
+        
+        if self.cache is not None:
+            print(self.cache.estadisticas())
+        print(MEMO_LIMPIEZA.estadisticas())
+        print(self.resumen_plan())
+        print("Latencias HTTP:")
+        print(self.http.resumen_latencias())
         
         return resultados
\ No newline at end of file
@@ -12,6 +12,8 @@ try:
     from optimizador_rutas import OptimizadorRutas
     from generador_mapas import GeneradorMapas
     from utils import crear_directorios, filtrar_por_zona, dividir_por_notificadores, filtrar_por_colonia
+    from cargador import cargar_tabla
+    from indice_zonas import IndiceZonas
 except ImportError as e:
     print(f"Error importando módulos: {e}")
 
@@ -28,7 +30,14 @@ class ModernOptimizadorRutasGUI:
         self.hilo_ejecucion = None
         self.archivo_csv = None
         self.df_original = None
+        self.indice_zonas = None
         self.tiene_coordenadas = False
+        # Reparto entre notificadores (None = config.PARTICION_NOTIFICADORES)
+        self.particion = None
+        # Resolver la zona completa como un solo VRP multi-vehículo
+        self.modo_vrp = False
+        # CSV de rutas anteriores para arrancar el solver en caliente
+        self.rutas_previas = None
         
         # Variables para nuevos controles
         self.modo_agrupacion_var = tk.StringVar(value="zona")
@@ -309,11 +318,8 @@ class ModernOptimizadorRutasGUI:
                                     foreground=self.colors['success'])
             
             try:
-                # Cargar CSV
-                if filename.endswith('.xlsx'):
-                    self.df_original = pd.read_excel(filename)
-                else:
-                    self.df_original = pd.read_csv(filename, encoding='utf-8')
+                # Cargar CSV (o Excel) desde la caché si no cambió
+                self.df_original = cargar_tabla(filename)
                 
                 # Detectar si tiene coordenadas
                 self.tiene_coordenadas = self._tiene_coordenadas(self.df_original)
@@ -325,8 +331,11 @@ class ModernOptimizadorRutasGUI:
                     messagebox.showerror("Error", "El archivo CSV debe tener una columna 'Zona'")
                     return
                 
+                # Índice zona → colonia, se construye una vez por archivo
+                self.indice_zonas = IndiceZonas(self.df_original)
+                
                 # Configurar zonas
-                zonas = sorted(self.df_original['Zona'].astype(str).unique())
+                zonas = self.indice_zonas.zonas()
                 self.zona_combo['values'] = zonas
                 
                 if zonas:
@@ -354,10 +363,9 @@ class ModernOptimizadorRutasGUI:
             return
         
         zona_seleccionada = self.zona_var.get()
-        df_zona = self.df_original[self.df_original['Zona'].astype(str) == zona_seleccionada]
         
-        if 'Colonia' in df_zona.columns:
-            colonias = sorted(df_zona['Colonia'].astype(str).unique())
+        if self.indice_zonas is not None and self.indice_zonas.columna_colonia is not None:
+            colonias = self.indice_zonas.colonias(zona_seleccionada)
             self.colonia_combo['values'] = colonias
             if colonias:
                 self.colonia_var.set(colonias[0])
@@ -470,9 +478,12 @@ class ModernOptimizadorRutasGUI:
             optimizador = OptimizadorRutas()
             generador_mapas = GeneradorMapas()
             
+            if self.rutas_previas and optimizador.cargar_rutas_previas(self.rutas_previas):
+                self.log(f"Arrancando desde las rutas previas: {self.rutas_previas}", "info")
+            
             # Filtrar por zona
             self.log(f"Filtrando datos para la zona: {zona}...", "info")
-            df_filtrado = filtrar_por_zona(self.df_original, zona)
+            df_filtrado = filtrar_por_zona(self.df_original, zona, self.indice_zonas)
             
             if df_filtrado.empty:
                 self.log("No se encontraron datos para la zona especificada", "error")
@@ -482,7 +493,7 @@ class ModernOptimizadorRutasGUI:
             if modo_agrupacion == "colonia" and self.colonia_var.get():
                 colonia = self.colonia_var.get()
                 self.log(f"Filtrando por colonia: {colonia}...", "info")
-                df_filtrado = filtrar_por_colonia(df_filtrado, colonia)
+                df_filtrado = filtrar_por_colonia(df_filtrado, colonia, self.indice_zonas, zona)
                 
                 if df_filtrado.empty:
                     self.log("No se encontraron datos para la colonia especificada", "error")
@@ -505,7 +516,8 @@ class ModernOptimizadorRutasGUI:
                 df = geocodificador.procesar_csv(archivo_filtrado, archivo_geocodificado)
             else:
                 self.log("Usando coordenadas existentes del CSV", "success")
-                df = df_filtrado
+                # Renombra Latitud/Longitud y convierte coordenadas UTM a grados
+                df = geocodificador._normalizar_coordenadas(df_filtrado)
             
             if df.empty:
                 self.log("No hay direcciones válidas para optimizar", "error")
@@ -516,7 +528,20 @@ class ModernOptimizadorRutasGUI:
             # Optimización
             if modo == "multi_notificador":
                 self.log(f"Generando rutas para {cuentas_por_notificador} cuentas por notificador...", "info")
-                chunks = dividir_por_notificadores(df, cuentas_por_notificador)
+                rutas_vrp = None
+                if self.modo_vrp:
+                    self.log("Resolviendo la zona completa como VRP multi-vehículo...", "info")
+                    rutas_vrp = optimizador.optimizar_flota(df, cuentas_por_notificador)
+                    if rutas_vrp is None:
+                        self.log("VRP sin solución - se resuelve cada notificador por separado", "warning")
+                
+                if rutas_vrp is not None:
+                    chunks = [chunk for chunk, _ in rutas_vrp]
+                    rutas_por_chunk = [[ruta] for _, ruta in rutas_vrp]
+                else:
+                    chunks = dividir_por_notificadores(df, cuentas_por_notificador, self.particion)
+                    self.log(f"Resolviendo {len(chunks)} rutas en paralelo...", "info")
+                    rutas_por_chunk = optimizador.optimizar_chunks(chunks)
                 
                 for i, chunk in enumerate(chunks):
                     self.log(f"Procesando Notificador {i+1} ({len(chunk)} cuentas)...", "info")
@@ -525,7 +550,7 @@ class ModernOptimizadorRutasGUI:
                             self.log(f"Notificador {i+1} sin direcciones válidas", "warning")
                             continue
                             
-                        rutas_chunk = optimizador.optimizar_ruta(chunk, 1)
+                        rutas_chunk = rutas_por_chunk[i]
                         if not rutas_chunk or len(rutas_chunk) == 0:
                             self.log(f"No se pudo optimizar ruta para Notificador {i+1}", "warning")
                             continue
@@ -656,9 +681,14 @@ class ModernOptimizadorRutasGUI:
         else:
             messagebox.showwarning("Carpeta no encontrada", "La carpeta 'datos/salida' no existe")
     
-    def ejecutar_como_cli(self, archivo: str, zona: str, cuentas_por_notificador: int = 0):
+    def ejecutar_como_cli(self, archivo: str, zona: str, cuentas_por_notificador: int = 0,
+                          particion: str = None, modo_vrp: bool = False,
+                          rutas_previas: str = None):
         """Ejecuta la optimización con parámetros predefinidos (para CLI)"""
         self.archivo_csv = archivo
+        self.particion = particion
+        self.modo_vrp = modo_vrp
+        self.rutas_previas = rutas_previas
         self.zona_var.set(zona)
         
         if cuentas_por_notificador > 0:
@@ -669,17 +699,15 @@ class ModernOptimizadorRutasGUI:
         
         # Cargar el archivo automáticamente
         try:
-            if archivo.endswith('.xlsx'):
-                self.df_original = pd.read_excel(archivo)
-            else:
-                self.df_original = pd.read_csv(archivo)
+            self.df_original = cargar_tabla(archivo)
+            self.indice_zonas = IndiceZonas(self.df_original)
             
             self.archivo_label.config(text=os.path.basename(archivo), 
                                     foreground=self.colors['success'])
             
             # Configurar zonas disponibles
             if 'Zona' in self.df_original.columns:
-                zonas = sorted(self.df_original['Zona'].astype(str).unique())
+                zonas = self.indice_zonas.zonas()
                 self.zona_combo['values'] = zonas
                 if zona in zonas:
                     self.zona_var.set(zona)
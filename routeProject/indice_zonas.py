@@ -0,0 +1,134 @@
+# routeProject/indice_zonas.py
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def _buscar_columna(df: pd.DataFrame, nombre: str) -> Optional[str]:
+    """Primera columna cuyo nombre coincide sin distinguir mayúsculas"""
+    for col in df.columns:
+        if str(col).lower() == nombre:
+            return col
+    return None
+
+
+def _normalizar(serie: pd.Series) -> Tuple[np.ndarray, List[str], List[str]]:
+    """
+    Códigos de la columna normalizada (trim + minúsculas).
+
+    El texto se normaliza sobre los valores distintos, no fila por fila.
+    Devuelve (código por fila, valores normalizados, nombre visible de cada uno).
+    Las celdas vacías (NaN) reciben el código -1: no pertenecen a ningún grupo
+    y ninguna búsqueda las encuentra.
+    """
+    nulos = serie.isna().to_numpy()
+    resultado = np.full(len(serie), -1, dtype=np.intp)
+    codigos, unicos = pd.factorize(serie[~nulos].astype(str))
+    visibles = pd.Index(unicos, dtype=object).str.strip()
+    codigos_norm, normalizados = pd.factorize(visibles.str.lower())
+    # El nombre visible es la primera variante (con trim) que aparece en el archivo
+    nombres = [''] * len(normalizados)
+    for i in range(len(visibles) - 1, -1, -1):
+        nombres[codigos_norm[i]] = visibles[i]
+    resultado[~nulos] = codigos_norm[codigos]
+    return resultado, list(normalizados), nombres
+
+
+def _agrupar(codigos: np.ndarray) -> List[np.ndarray]:
+    """Posiciones de fila de cada código, en el orden original del archivo"""
+    orden = np.argsort(codigos, kind='stable')
+    cortes = np.flatnonzero(np.diff(codigos[orden])) + 1
+    return np.split(orden, cortes)
+
+
+class IndiceZonas:
+    """
+    Índice zona → colonia → posiciones de fila de un DataFrame de entrada.
+
+    Se construye una sola vez al cargar el archivo; después filtrar una zona o
+    colonia cuesta O(k) con k filas resultantes en lugar de normalizar el texto
+    de toda la tabla en cada consulta. Las búsquedas ignoran mayúsculas y
+    espacios al inicio/fin, igual que filtrar_por_zona/filtrar_por_colonia.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.columna_zona = _buscar_columna(df, 'zona') if df is not None else None
+        self.columna_colonia = _buscar_columna(df, 'colonia') if df is not None else None
+
+        self._zonas: Dict[str, np.ndarray] = {}
+        self._colonias: Dict[str, Dict[str, np.ndarray]] = {}
+        self._nombres_zona: Dict[str, str] = {}
+        self._nombres_colonia: Dict[str, Dict[str, str]] = {}
+
+        if self.columna_zona is None or df.empty:
+            return
+
+        codigos_zona, zonas, nombres_zona = _normalizar(df[self.columna_zona])
+        for filas in _agrupar(codigos_zona):
+            codigo = codigos_zona[filas[0]]
+            if codigo < 0:
+                continue
+            self._zonas[zonas[codigo]] = filas
+            self._nombres_zona[zonas[codigo]] = nombres_zona[codigo]
+
+        if self.columna_colonia is None:
+            return
+
+        codigos_colonia, colonias, nombres_colonia = _normalizar(df[self.columna_colonia])
+        # Una sola pasada agrupa por la pareja (zona, colonia); sin zona o sin colonia = -1
+        claves = np.where((codigos_zona < 0) | (codigos_colonia < 0), -1,
+                          codigos_zona.astype(np.int64) * len(colonias) + codigos_colonia)
+        for filas in _agrupar(claves):
+            if claves[filas[0]] < 0:
+                continue
+            zona = zonas[codigos_zona[filas[0]]]
+            colonia = colonias[codigos_colonia[filas[0]]]
+            self._colonias.setdefault(zona, {})[colonia] = filas
+            self._nombres_colonia.setdefault(zona, {})[colonia] = nombres_colonia[codigos_colonia[filas[0]]]
+
+    def zonas(self) -> List[str]:
+        """Nombres de las zonas, ordenados"""
+        return sorted(self._nombres_zona.values())
+
+    def colonias(self, zona: str) -> List[str]:
+        """Nombres de las colonias de una zona, ordenados"""
+        return sorted(self._nombres_colonia.get(zona.strip().lower(), {}).values())
+
+    def filas(self, zona: str, colonia: Optional[str] = None) -> np.ndarray:
+        """Posiciones (iloc) de las filas de la zona, y de la colonia si se indica"""
+        clave_zona = zona.strip().lower()
+        if colonia is None or self.columna_colonia is None:
+            return self._zonas.get(clave_zona, np.empty(0, dtype=np.intp))
+        colonias = self._colonias.get(clave_zona, {})
+        return colonias.get(colonia.strip().lower(), np.empty(0, dtype=np.intp))
+
+    def filtrar(self, zona: str, colonia: Optional[str] = None) -> pd.DataFrame:
+        """Copia de las filas de la zona (y colonia); mismos avisos que utils.filtrar_por_*"""
+        if self.columna_zona is None:
+            print("No se encontró columna 'Zona' en el CSV")
+            if self.df is not None:
+                print(f"Columnas disponibles: {', '.join(map(str, self.df.columns))}")
+            return pd.DataFrame()
+
+        filas = self.filas(zona)
+        if len(filas) == 0:
+            print(f"No se encontraron registros para la zona: '{zona}'")
+            print(f"Zonas disponibles: {list(self._nombres_zona.values())}")
+            return self.df.iloc[filas].copy()
+
+        if colonia is not None:
+            if self.columna_colonia is None:
+                print("No se encontró columna 'Colonia' en el CSV")
+            else:
+                filas = self.filas(zona, colonia)
+                if len(filas) == 0:
+                    print(f"No se encontraron registros para la colonia: '{colonia}'")
+                    print(f"Colonias disponibles: {self.colonias(zona)}")
+
+        return self.df.iloc[filas].copy()
+
+    def por_zona(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Recorre todas las zonas (para procesarlas en lote) sin volver a filtrar la tabla"""
+        for zona, filas in self._zonas.items():
+            yield self._nombres_zona[zona], self.df.iloc[filas].copy()
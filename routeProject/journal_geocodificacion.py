@@ -0,0 +1,66 @@
+# routeProject/journal_geocodificacion.py
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+Resultado = Tuple[Optional[float], Optional[float], Optional[str]]
+
+
+class JournalGeocodificacion:
+    """
+    Bitácora en disco (JSON por línea) de las direcciones ya geocodificadas en una corrida.
+
+    Cada resultado se agrega en cuanto llega, así que si el proceso se cae o se
+    interrumpe, la siguiente corrida con la misma salida retoma donde quedó. Las
+    entradas van por clave normalizada de consulta, no por número de fila: siguen
+    valiendo aunque el archivo de entrada cambie de orden.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = None
+
+    def cargar(self) -> Dict[str, Resultado]:
+        """Resultados registrados por corridas anteriores (se ignora una última línea cortada)"""
+        resultados = {}
+        if not os.path.exists(self.ruta):
+            return resultados
+
+        with open(self.ruta, 'r', encoding='utf-8') as archivo:
+            for linea in archivo:
+                try:
+                    entrada = json.loads(linea)
+                    resultados[entrada['clave']] = tuple(entrada['resultado'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return resultados
+
+    def agregar(self, clave: str, resultado: Resultado):
+        """Registra un resultado y lo manda a disco de inmediato"""
+        if self._archivo is None:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            # Si la corrida anterior murió a media línea, empezar en una nueva
+            linea_cortada = False
+            if os.path.exists(self.ruta) and os.path.getsize(self.ruta) > 0:
+                with open(self.ruta, 'rb') as archivo:
+                    archivo.seek(-1, os.SEEK_END)
+                    linea_cortada = archivo.read(1) != b'\n'
+            self._archivo = open(self.ruta, 'a', encoding='utf-8')
+            if linea_cortada:
+                self._archivo.write('\n')
+
+        self._archivo.write(json.dumps({'clave': clave, 'resultado': list(resultado)}, ensure_ascii=False) + '\n')
+        self._archivo.flush()
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def eliminar(self):
+        """Borra la bitácora cuando la corrida terminó y las salidas ya están escritas"""
+        self.cerrar()
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
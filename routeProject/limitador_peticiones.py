@@ -0,0 +1,63 @@
+# routeProject/limitador_peticiones.py
+import threading
+import time
+
+
+class LimitadorEstricto:
+    """Garantiza un intervalo mínimo entre peticiones (política de Nominatim público: 1 req/s)"""
+
+    def __init__(self, intervalo: float = 1.0):
+        self.intervalo = intervalo
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que le toque el turno a la siguiente petición"""
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        espera = turno - ahora
+        if espera > 0:
+            time.sleep(espera)
+
+
+class LimitadorTokenBucket:
+    """Token bucket: permite ráfagas de `capacidad` peticiones y una tasa sostenida de `tasa` req/s"""
+
+    def __init__(self, tasa: float = 20.0, capacidad: int = 10):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultima_recarga = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Consume un token, esperando si el bucket está vacío"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultima_recarga) * self.tasa)
+            self._ultima_recarga = ahora
+            # Reservar el token aunque quede en negativo: la espera cubre la deuda
+            self._tokens -= 1
+            espera = -self._tokens / self.tasa if self._tokens < 0 else 0.0
+        if espera > 0:
+            time.sleep(espera)
+
+
+def crear_limitador(modo: str, url: str, intervalo: float = 1.0, tasa: float = 20.0, rafaga: int = 10):
+    """
+    Crea la política de rate limit configurada.
+
+    modo 'auto' usa la política estricta contra nominatim.openstreetmap.org y
+    token bucket contra cualquier otro servidor (instancia propia).
+    """
+    if modo == 'auto':
+        modo = 'estricto' if 'nominatim.openstreetmap.org' in url else 'token_bucket'
+
+    if modo == 'estricto':
+        return LimitadorEstricto(intervalo)
+    if modo == 'token_bucket':
+        return LimitadorTokenBucket(tasa, rafaga)
+
+    raise ValueError(f"Modo de rate limit desconocido: {modo}")
@@ -1,9 +1,85 @@
 # routeProject/limpiador_direcciones.py
+import numpy as np
 import pandas as pd
 import re
 import unicodedata
 import argparse
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from cargador import cargar_tabla, detectar_codificacion
+from memo_limpieza import MEMO_LIMPIEZA
+
+# Secuencias de UTF-8 leído como Latin-1 y su carácter correcto (se aplican en este orden)
+CORRECCIONES_MALA_CODIFICACION = {
+    'Ã¡': 'á', 'Ã©': 'é', 'Ã­': 'í', 'Ã³': 'ó', 'Ãº': 'ú', 
+    'Ã±': 'ñ', 'Ã': 'Á', 'Ã': 'É', 'Ã': 'Í', 'Ã': 'Ó', 
+    'Ã': 'Ú', 'Ã': 'Ñ', 'Ã¼': 'ü', 'Ã': 'Ü',
+    'Â°': '°', 'Âª': 'ª', 'Âº': 'º', 'Â¿': '¿', 'Â¡': '¡',
+    'Ã': 'í',  # Caso especial para algunos caracteres
+}
+
+# Palabras que se dejan en mayúsculas en lugar de pasarlas a título
+ABREVIATURAS = ['Av', 'Cll', 'Cra', 'No', 'Num', 'Núm', 'Col', 'Cp', 'De', 'Del', 'La', 'Los', 'Las']
+
+# Correcciones comunes de formato (sin distinguir mayúsculas, en este orden)
+CORRECCIONES_FORMATO = {
+    r'\bAv\b\.?': 'Av.',
+    r'\bCalle\b': 'Cll.',
+    r'\bCll\b\.?': 'Cll.',
+    r'\bCarrera\b': 'Cra.',
+    r'\bCra\b\.?': 'Cra.',
+    r'\bNumero\b': 'No.',
+    r'\bNúmero\b': 'No.',
+    r'\bNum\b\.?': 'No.',
+    r'\bNúm\b\.?': 'No.',
+    r'\bNo\b\.?': 'No.',
+    r'\bColonia\b': 'Col.',
+    r'\bCol\b\.?': 'Col.',
+    r'#\s*': 'No. ',
+    r'\bY\b': 'y',  # 'y' en minúscula para conjunciones
+    r'\bE\b': 'e',  # 'e' en minúscula para conjunciones
+}
+
+_CORRECCIONES_COMPILADAS = [(re.compile(patron, re.IGNORECASE), reemplazo)
+                            for patron, reemplazo in CORRECCIONES_FORMATO.items()]
+_PUNTO_SIN_ESPACIO_RE = re.compile(r'\.([a-zA-Z])')
+
+# Mala codificación en una sola pasada para limpiar_serie: probar las secuencias de
+# dos caracteres antes que 'Ã' suelta da lo mismo que el reemplazo en orden
+_MALA_CODIFICACION_RE = re.compile('|'.join(
+    re.escape(clave) for clave in sorted(CORRECCIONES_MALA_CODIFICACION, key=len, reverse=True)))
+
+# Palabras que son abreviaturas, con puntos en cualquier posición
+_ABREVIATURA_RE = re.compile(r'(?<!\S)(?=[.' + ''.join(sorted({a[0] for a in ABREVIATURAS})) + r'])\.*(?:' + '|'.join(
+    r'\.*'.join(map(re.escape, abreviatura)) for abreviatura in ABREVIATURAS) + r')\.*(?!\S)')
+
+def _etapas_correcciones():
+    """
+    Correcciones de formato combinadas en tres expresiones (un grupo por patrón).
+    
+    '#' va aparte porque su reemplazo mete letras donde había un símbolo y cambia
+    los límites de palabra que ven 'Y'/'E' después. Si todos los patrones de un
+    grupo empiezan con \b y una letra, el \b se saca de la alternancia y se
+    adelanta la primera letra para no probar cada patrón en cada posición.
+    """
+    patrones = list(CORRECCIONES_FORMATO.items())
+    corte = [patron for patron, _ in patrones].index(r'#\s*')
+    etapas = []
+    for grupo in (patrones[:corte], patrones[corte:corte + 1], patrones[corte + 1:]):
+        cuerpos = [patron for patron, _ in grupo]
+        prefijo = ''
+        if all(patron.startswith(r'\b') and patron[2:3].isalpha() for patron in cuerpos):
+            iniciales = ''.join(sorted({patron[2].lower() for patron in cuerpos}))
+            prefijo = rf'(?<!\w)(?=[{iniciales}])'
+            cuerpos = [patron[2:] for patron in cuerpos]
+        alternancia = '|'.join(f'({cuerpo})' for cuerpo in cuerpos)
+        expresion = re.compile(f'{prefijo}(?:{alternancia})', re.IGNORECASE)
+        etapas.append((expresion, [reemplazo for _, reemplazo in grupo]))
+    return etapas
+
+_ETAPAS_CORRECCIONES = _etapas_correcciones()
 
 def normalizar_caracteres_especiales(texto):
     if pd.isna(texto):
@@ -12,23 +88,21 @@ def normalizar_caracteres_especiales(texto):
     texto = str(texto)
     
     # Corregir caracteres mal codificados comunes (cuando UTF-8 se interpreta como Latin-1)
-    correcciones_mala_codificacion = {
-        'Ã¡': 'á', 'Ã©': 'é', 'Ã­': 'í', 'Ã³': 'ó', 'Ãº': 'ú', 
-        'Ã±': 'ñ', 'Ã': 'Á', 'Ã': 'É', 'Ã': 'Í', 'Ã': 'Ó', 
-        'Ã': 'Ú', 'Ã': 'Ñ', 'Ã¼': 'ü', 'Ã': 'Ü',
-        'Â°': '°', 'Âª': 'ª', 'Âº': 'º', 'Â¿': '¿', 'Â¡': '¡',
-        'Ã': 'í',  # Caso especial para algunos caracteres
-    }
-    
-    for mal_codificado, correcto in correcciones_mala_codificacion.items():
+    for mal_codificado, correcto in CORRECCIONES_MALA_CODIFICACION.items():
         texto = texto.replace(mal_codificado, correcto)
     
-    # Normalizar caracteres Unicode (descomponer y luego recomponer)
+    return _quitar_acentos(texto)
+
+def _quitar_acentos(texto):
+    """Normaliza Unicode (descomponer, quitar marcas, recomponer)"""
     texto = unicodedata.normalize('NFD', texto)
     texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
-    texto = unicodedata.normalize('NFC', texto)
-    
-    return texto
+    return unicodedata.normalize('NFC', texto)
+
+def _titulo_palabras(palabras):
+    """Título por palabra, con las abreviaturas conocidas en mayúsculas"""
+    return ' '.join(palabra.upper() if palabra.replace('.', '') in ABREVIATURAS else palabra.title()
+                    for palabra in palabras)
 
 def limpiar_campo(texto):
     """Limpia un campo de texto"""
@@ -41,49 +115,85 @@ def limpiar_campo(texto):
     texto = normalizar_caracteres_especiales(texto)
     
     # Convertir a título pero preservar acrónimos y abreviaturas
-    palabras = texto.split()
-    palabras_corregidas = []
-    
-    for palabra in palabras:
-        # Si es una abreviatura conocida, mantener en mayúsculas
-        abreviaturas = ['Av', 'Cll', 'Cra', 'No', 'Num', 'Núm', 'Col', 'Cp', 'De', 'Del', 'La', 'Los', 'Las']
-        if palabra.replace('.', '') in abreviaturas:
-            palabras_corregidas.append(palabra.upper())
-        else:
-            palabras_corregidas.append(palabra.title())
-    
-    texto = ' '.join(palabras_corregidas)
+    texto = _titulo_palabras(texto.split())
     
     # Remover múltiples espacios
     texto = re.sub(r'\s+', ' ', texto)
     
     # Correcciones comunes de formato
-    correcciones = {
-        r'\bAv\b\.?': 'Av.',
-        r'\bCalle\b': 'Cll.',
-        r'\bCll\b\.?': 'Cll.',
-        r'\bCarrera\b': 'Cra.',
-        r'\bCra\b\.?': 'Cra.',
-        r'\bNumero\b': 'No.',
-        r'\bNúmero\b': 'No.',
-        r'\bNum\b\.?': 'No.',
-        r'\bNúm\b\.?': 'No.',
-        r'\bNo\b\.?': 'No.',
-        r'\bColonia\b': 'Col.',
-        r'\bCol\b\.?': 'Col.',
-        r'#\s*': 'No. ',
-        r'\bY\b': 'y',  # 'y' en minúscula para conjunciones
-        r'\bE\b': 'e',  # 'e' en minúscula para conjunciones
-    }
-    
-    for patron, reemplazo in correcciones.items():
-        texto = re.sub(patron, reemplazo, texto, flags=re.IGNORECASE)
+    for patron, reemplazo in _CORRECCIONES_COMPILADAS:
+        texto = patron.sub(reemplazo, texto)
     
     # Asegurar que después de punto haya espacio si no lo hay
-    texto = re.sub(r'\.([a-zA-Z])', r'. \1', texto)
+    texto = _PUNTO_SIN_ESPACIO_RE.sub(r'. \1', texto)
     
     return texto
 
+def _tabla_acentos(limite=0x250):
+    """Tabla de str.translate equivalente a _quitar_acentos para caracteres < limite"""
+    tabla = {}
+    for codigo in range(limite):
+        sin_acento = _quitar_acentos(chr(codigo))
+        if sin_acento != chr(codigo):
+            tabla[codigo] = sin_acento
+    return tabla
+
+# Hasta U+024F (latín extendido) no hay marcas combinantes: carácter por carácter da
+# lo mismo que NFD/NFC sobre el texto completo. El resto pasa por _quitar_acentos.
+_TABLA_ACENTOS = _tabla_acentos()
+_FUERA_DE_TABLA_RE = re.compile('[^\x00-\u024f]')
+
+def limpiar_serie(serie: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de limpiar_campo para una columna completa.
+    
+    Solo se limpian los valores distintos (con el memo compartido con el
+    geocodificador) y el resultado se reparte a las filas por sus códigos;
+    es idéntico a serie.apply(limpiar_campo).
+    """
+    return _por_valores_unicos(serie, 'campo', lambda textos: _limpiar_textos(textos).tolist())
+
+def _por_valores_unicos(serie: pd.Series, tipo: str, funcion_lote) -> pd.Series:
+    """Factoriza la columna, limpia cada valor distinto una vez y lo replica a sus filas"""
+    validos = serie.notna().to_numpy()
+    if not validos.any():
+        return serie.copy()
+    
+    codigos, unicos = pd.factorize(serie[validos].astype(str))
+    limpios = MEMO_LIMPIEZA.limpiar_varios(tipo, funcion_lote, unicos)
+    
+    resultado = serie.astype(object)
+    resultado[validos] = np.asarray(limpios, dtype=object)[codigos]
+    return resultado
+
+def _limpiar_textos(textos) -> pd.Series:
+    """
+    Pasos de limpiar_campo sobre una lista de textos con operaciones .str de
+    pandas, expresiones precompiladas y una tabla de traducción para acentos.
+    """
+    texto = pd.Series(textos, dtype=object).str.strip()
+    
+    # Caracteres mal codificados y acentos
+    texto = texto.str.replace(_MALA_CODIFICACION_RE, lambda m: CORRECCIONES_MALA_CODIFICACION[m.group()], regex=True)
+    fuera_de_tabla = texto.str.contains(_FUERA_DE_TABLA_RE).to_numpy()
+    sin_acentos = texto.str.translate(_TABLA_ACENTOS)
+    if fuera_de_tabla.any():
+        sin_acentos[fuera_de_tabla] = texto[fuera_de_tabla].map(_quitar_acentos).to_numpy()
+    
+    # Espacios simples; título por palabra y abreviaturas solo donde aparecen
+    texto = sin_acentos.str.replace(r'\s+', ' ', regex=True).str.strip()
+    titulo = texto.str.title()
+    con_abreviaturas = texto.str.contains(_ABREVIATURA_RE).to_numpy()
+    if con_abreviaturas.any():
+        titulo[con_abreviaturas] = texto[con_abreviaturas].map(
+            lambda t: _titulo_palabras(t.split(' '))).to_numpy()
+    
+    # Correcciones de formato y espacio después de punto
+    texto = titulo
+    for expresion, reemplazos in _ETAPAS_CORRECCIONES:
+        texto = texto.str.replace(expresion, lambda m, r=reemplazos: r[m.lastindex - 1], regex=True)
+    return texto.str.replace(_PUNTO_SIN_ESPACIO_RE, r'. \1', regex=True)
+
 def validar_cp(cp):
     """Valida y formatea el código postal"""
     if pd.isna(cp):
@@ -106,44 +216,50 @@ def validar_cp(cp):
     
     return cp
 
+def _limpiar_bloque(df: pd.DataFrame, verbose: bool = False) -> pd.DataFrame:
+    """Estandariza los nombres de columna y limpia Domicilio, Colonia y Cp"""
+    # Estandarizar nombres de columnas (case insensitive)
+    df.columns = df.columns.str.strip().str.title()
+    
+    if 'Domicilio' in df.columns:
+        if verbose:
+            print("Limpiando campo 'Domicilio'...")
+        df['Domicilio'] = limpiar_serie(df['Domicilio'])
+    
+    if 'Colonia' in df.columns:
+        if verbose:
+            print("Limpiando campo 'Colonia'...")
+        df['Colonia'] = limpiar_serie(df['Colonia'])
+    
+    if 'Cp' in df.columns:
+        if verbose:
+            print("Limpiando campo 'Cp'...")
+        df['Cp'] = _por_valores_unicos(df['Cp'], 'cp', lambda textos: [validar_cp(cp) for cp in textos])
+    
+    return df
+
+def _mostrar_muestras(df: pd.DataFrame):
+    """Muestra algunas direcciones ya limpias"""
+    print("\nMuestra de datos limpios:")
+    if 'Domicilio' in df.columns:
+        muestras = df['Domicilio'].head(3).tolist()
+        for i, muestra in enumerate(muestras, 1):
+            print(f"  {i}. {muestra}")
+
 def limpiar_direcciones_csv(archivo_entrada: str, archivo_salida: str):
     """Limpia y estandariza las direcciones antes de la geocodificación"""
     try:
-        # Detectar automáticamente la codificación del archivo
-        try:
-            df = pd.read_csv(archivo_entrada, encoding='utf-8')
-        except UnicodeDecodeError:
-            try:
-                df = pd.read_csv(archivo_entrada, encoding='latin-1')
-            except UnicodeDecodeError:
-                df = pd.read_csv(archivo_entrada, encoding='iso-8859-1')
+        # Detecta la codificación y reutiliza la caché si el archivo no cambió
+        df = cargar_tabla(archivo_entrada)
         
         print(f"Archivo leído con éxito: {archivo_entrada}")
         print(f"Número de registros: {len(df)}")
         
-        # Estandarizar nombres de columnas (case insensitive)
-        df.columns = df.columns.str.strip().str.title()
+        df = _limpiar_bloque(df, verbose=True)
         print(f"Columnas detectadas: {list(df.columns)}")
+        print(MEMO_LIMPIEZA.estadisticas())
         
-        # Limpiar cada campo
-        if 'Domicilio' in df.columns:
-            print("Limpiando campo 'Domicilio'...")
-            df['Domicilio'] = df['Domicilio'].apply(limpiar_campo)
-        
-        if 'Colonia' in df.columns:
-            print("Limpiando campo 'Colonia'...")
-            df['Colonia'] = df['Colonia'].apply(limpiar_campo)
-        
-        if 'Cp' in df.columns:
-            print("Limpiando campo 'Cp'...")
-            df['Cp'] = df['Cp'].apply(validar_cp)
-        
-        # Mostrar algunas muestras de los datos limpios
-        print("\nMuestra de datos limpios:")
-        if 'Domicilio' in df.columns:
-            muestras = df['Domicilio'].head(3).tolist()
-            for i, muestra in enumerate(muestras, 1):
-                print(f"  {i}. {muestra}")
+        _mostrar_muestras(df)
         
         # Guardar archivo limpio
         df.to_csv(archivo_salida, index=False, encoding='utf-8')
@@ -156,6 +272,90 @@ def limpiar_direcciones_csv(archivo_entrada: str, archivo_salida: str):
         print(f"Error procesando el archivo: {e}")
         return False
 
+def limpiar_direcciones_csv_por_bloques(archivo_entrada: str, archivo_salida: str,
+                                        tamano_bloque: int = 100000, procesos: int = 1):
+    """
+    Limpia un CSV grande por bloques de tamano_bloque filas con memoria acotada.
+    
+    La codificación se detecta una vez con una muestra de bytes; cada bloque
+    limpio se agrega al archivo de salida en el orden original. Con procesos > 1
+    los bloques se limpian en paralelo, con a lo más dos bloques por proceso en
+    vuelo. Los valores se leen como texto para que todos los bloques se limpien
+    igual sin depender de los tipos que pandas infiera en cada uno.
+    
+    Si un bloque falla se borra la salida parcial (archivo_salida + '.tmp').
+    """
+    temporal = archivo_salida + '.tmp'
+    codificacion = None
+    leidos = 0
+    bloques = 0
+    try:
+        codificacion = detectar_codificacion(archivo_entrada)
+        print(f"Leyendo {archivo_entrada} por bloques de {tamano_bloque:,} filas ({codificacion})")
+        lector = pd.read_csv(archivo_entrada, encoding=codificacion, dtype=str, chunksize=tamano_bloque)
+        
+        def leer():
+            nonlocal leidos
+            for df in lector:
+                leidos += 1
+                yield df
+        
+        inicio = time.perf_counter()
+        filas = 0
+        
+        def escribir(df):
+            nonlocal filas, bloques
+            if bloques == 0:
+                print(f"Columnas detectadas: {list(df.columns)}")
+                _mostrar_muestras(df)
+            df.to_csv(temporal, index=False, encoding='utf-8', mode='w' if bloques == 0 else 'a', header=bloques == 0)
+            filas += len(df)
+            bloques += 1
+            segundos = time.perf_counter() - inicio
+            print(f"Bloque {bloques}: {filas:,} filas ({filas / segundos:,.0f} filas/s)")
+        
+        if procesos > 1:
+            with ProcessPoolExecutor(max_workers=procesos) as executor:
+                pendientes = deque()
+                for df in leer():
+                    pendientes.append(executor.submit(_limpiar_bloque, df))
+                    # Acotar lo que está en memoria y escribir en el orden de lectura
+                    while len(pendientes) >= 2 * procesos:
+                        escribir(pendientes.popleft().result())
+                while pendientes:
+                    escribir(pendientes.popleft().result())
+        else:
+            for df in leer():
+                escribir(_limpiar_bloque(df))
+        
+        if bloques == 0:
+            print("El archivo no tiene registros")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+        
+        os.replace(temporal, archivo_salida)
+        segundos = time.perf_counter() - inicio
+        print(f"\n{filas:,} filas limpiadas en {segundos:.1f} s ({filas / segundos:,.0f} filas/s)")
+        print(f"Archivo limpiado guardado en: {archivo_salida}")
+        print(f"Tamaño del archivo: {os.path.getsize(archivo_salida)} bytes")
+        
+        return True
+        
+    except Exception as e:
+        if isinstance(e, UnicodeDecodeError):
+            # Falla la lectura: el bloque siguiente al último leído
+            print(f"Error leyendo el bloque {leidos + 1} (filas desde la {leidos * tamano_bloque + 1:,}): {e}")
+            print(f"   Probable causa: la codificación se detectó como {codificacion} con el primer MB "
+                  f"del archivo y más adelante hay bytes en otra codificación (p. ej. latin-1). "
+                  f"Convierte el archivo a UTF-8 o usa limpiar_direcciones_csv.")
+        else:
+            print(f"Error procesando el bloque {bloques + 1}: {e}")
+        if os.path.exists(temporal):
+            os.remove(temporal)
+            print(f"Salida parcial eliminada: {temporal}")
+        return False
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description='Limpiador de direcciones CSV - Normaliza y limpia direcciones para geocodificación',
@@ -164,6 +364,7 @@ if __name__ == "__main__":
 Ejemplos de uso:
   python limpiador_direcciones.py --entrada datos_sucios.csv --salida datos_limpios.csv
   python limpiador_direcciones.py -e entrada.csv -s salida.csv
+  python limpiador_direcciones.py -e mensual.csv -s limpio.csv --bloque 100000 --procesos 4
         """
     )
     
@@ -173,6 +374,10 @@ Ejemplos de uso:
     parser.add_argument('-s', '--salida', 
                        required=True, 
                        help='Archivo CSV de salida con direcciones limpias')
+    parser.add_argument('--bloque', type=int, default=None,
+                       help='Procesar por bloques de este número de filas (archivos muy grandes)')
+    parser.add_argument('--procesos', type=int, default=1,
+                       help='Procesos para limpiar bloques en paralelo (solo con --bloque)')
     
     args = parser.parse_args()
     
@@ -187,7 +392,14 @@ Ejemplos de uso:
         os.makedirs(directorio_salida)
     
     # Ejecutar la limpieza
-    exito = limpiar_direcciones_csv(args.entrada, args.salida)
+    if args.bloque and args.entrada.lower().endswith(('.xlsx', '.xls')):
+        print("Los archivos Excel no se pueden leer por bloques; se procesan completos")
+        args.bloque = None
+    
+    if args.bloque:
+        exito = limpiar_direcciones_csv_por_bloques(args.entrada, args.salida, args.bloque, args.procesos)
+    else:
+        exito = limpiar_direcciones_csv(args.entrada, args.salida)
     
     if not exito:
         exit(1)
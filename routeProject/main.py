@@ -11,6 +11,12 @@ def main():
         parser.add_argument('--zona', required=True, help='Zone to optimize')
         parser.add_argument('--cuentas-por-notificador', type=int, default=0, 
                            help='Number of accounts per notifier (0 for single route)')
+        parser.add_argument('--particion', choices=['hilbert', 'orden'], default=None,
+                           help='How accounts are split between notifiers (hilbert = compact groups)')
+        parser.add_argument('--vrp', action='store_true',
+                           help='Solve the whole zone as one multi-vehicle VRP')
+        parser.add_argument('--rutas-previas', type=str, default='',
+                           help='Previous route CSV used to warm-start the solver')
         parser.add_argument('--cli-only', action='store_true', 
                            help='Run in CLI-only mode without GUI')
         parser.add_argument('--gui', action='store_true', 
@@ -34,6 +40,12 @@ def main():
                     '--zona', args.zona,
                     '--cuentas-por-notificador', str(args.cuentas_por_notificador)
                 ]
+                if args.particion:
+                    sys.argv += ['--particion', args.particion]
+                if args.vrp:
+                    sys.argv.append('--vrp')
+                if args.rutas_previas:
+                    sys.argv += ['--rutas-previas', args.rutas_previas]
                 cli_main()
             else:
                 # Modo CLI con GUI
@@ -50,7 +62,8 @@ def main():
                     app = ModernOptimizadorRutasGUI(root)
                     
                     # Pre-cargar parámetros y ejecutar
-                    app.ejecutar_como_cli(args.archivo, args.zona, args.cuentas_por_notificador)
+                    app.ejecutar_como_cli(args.archivo, args.zona, args.cuentas_por_notificador,
+                                          args.particion, args.vrp, args.rutas_previas)
                     
                     root.mainloop()
                     return 0
@@ -64,6 +77,12 @@ def main():
                         '--zona', args.zona,
                         '--cuentas-por-notificador', str(args.cuentas_por_notificador)
                     ]
+                    if args.particion:
+                        sys.argv += ['--particion', args.particion]
+                    if args.vrp:
+                        sys.argv.append('--vrp')
+                    if args.rutas_previas:
+                        sys.argv += ['--rutas-previas', args.rutas_previas]
                     cli_main()
                     
         except SystemExit as e:
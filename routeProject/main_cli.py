@@ -2,6 +2,8 @@ import pandas as pd
 from geocodificador import Geocodificador
 from optimizador_rutas import OptimizadorRutas
 from generador_mapas import GeneradorMapas
+from cargador import cargar_tabla
+from indice_zonas import IndiceZonas
 from utils import crear_directorios, filtrar_por_zona, dividir_por_notificadores, mostrar_ruta, filtrar_por_colonia
 import argparse
 from typing import List
@@ -29,6 +31,23 @@ def main():
                        help='Dirección para punto de inicio personalizado (opcional)')
     parser.add_argument('--usar-coordenadas', action='store_true',
                        help='Usar coordenadas existentes en el CSV (si disponibles)')
+    parser.add_argument('--vecinos-k', type=int, default=0,
+                       help='Modo disperso para zonas grandes: solo los k vecinos más cercanos '
+                            'de cada parada tienen costo real (0 = todos los arcos)')
+    parser.add_argument('--particion', choices=['hilbert', 'orden'], default=None,
+                       help='Reparto de cuentas entre notificadores: hilbert (grupos compactos) '
+                            'u orden (orden del archivo). Default: config.PARTICION_NOTIFICADORES')
+    parser.add_argument('--vrp', action='store_true',
+                       help='Resolver toda la zona en un solo VRP con un vehículo por notificador '
+                            '(capacidad = cuentas por notificador) en lugar de dividir y resolver cada parte')
+    parser.add_argument('--procesos', type=int, default=0,
+                       help='Procesos para resolver en paralelo las rutas de los notificadores '
+                            '(0 = config.OPTIMIZACION_PROCESOS / todos los núcleos)')
+    parser.add_argument('--tiempo-limite', type=int, default=0,
+                       help='Segundos máximos del solver por ruta (0 = config.OPTIMIZACION_TIEMPO_LIMITE)')
+    parser.add_argument('--rutas-previas', type=str, default='',
+                       help='CSV de rutas de una corrida anterior (rutas_*notificadores.csv o '
+                            'ruta_unica_*.csv) para arrancar el solver desde ellas')
     
     args = parser.parse_args()
     
@@ -52,10 +71,22 @@ def main():
         if args.usar_coordenadas:
             print("Usando coordenadas existentes del CSV")
         
+        if args.vecinos_k > 0:
+            print(f"Modo disperso: {args.vecinos_k} vecinos por parada")
+            optimizador.vecinos_k = args.vecinos_k
+        
+        if args.tiempo_limite > 0:
+            optimizador.tiempo_limite = args.tiempo_limite
+        
+        if args.rutas_previas:
+            print(f"Rutas previas: {args.rutas_previas}")
+            optimizador.cargar_rutas_previas(args.rutas_previas)
+        
         # Filtro por zona
         print(f"\nFiltrando datos para la zona: {args.zona}...")
-        df_original = pd.read_csv(args.archivo, encoding='utf-8')
-        df_filtrado = filtrar_por_zona(df_original, args.zona)
+        df_original = cargar_tabla(args.archivo)
+        indice_zonas = IndiceZonas(df_original)
+        df_filtrado = filtrar_por_zona(df_original, args.zona, indice_zonas)
         
         if df_filtrado.empty:
             print(f"No se encontraron datos para la zona: {args.zona}")
@@ -65,7 +96,7 @@ def main():
         # Filtro por colonia si se especificó
         if args.colonia:
             print(f"Filtrando por colonia: {args.colonia}...")
-            df_filtrado = filtrar_por_colonia(df_filtrado, args.colonia)
+            df_filtrado = filtrar_por_colonia(df_filtrado, args.colonia, indice_zonas, args.zona)
             
             if df_filtrado.empty:
                 print(f"No se encontraron datos para la colonia: {args.colonia}")
@@ -120,7 +151,20 @@ def main():
         # Optimizar rutas
         if args.cuentas_por_notificador > 0:
             # Modo múltiples notificadores
-            chunks = dividir_por_notificadores(df, args.cuentas_por_notificador)
+            rutas_vrp = None
+            if args.vrp:
+                print("\nResolviendo la zona completa como VRP multi-vehículo...")
+                rutas_vrp = optimizador.optimizar_flota(df, args.cuentas_por_notificador)
+                if rutas_vrp is None:
+                    print("VRP sin solución - se divide por notificadores y se resuelve cada parte")
+            
+            if rutas_vrp is not None:
+                chunks = [chunk for chunk, _ in rutas_vrp]
+                rutas_por_chunk = [[ruta] for _, ruta in rutas_vrp]
+            else:
+                chunks = dividir_por_notificadores(df, args.cuentas_por_notificador, args.particion)
+                # Los chunks son independientes: se resuelven en paralelo y vuelven en orden
+                rutas_por_chunk = optimizador.optimizar_chunks(chunks, args.procesos or None)
             todas_rutas = []
             datos_rutas = []  # Para el CSV final
             
@@ -136,7 +180,7 @@ def main():
                 
                 # Optimizar ruta para este chunk
                 try:
-                    rutas_chunk = optimizador.optimizar_ruta(chunk, 1)
+                    rutas_chunk = rutas_por_chunk[i]
                     
                     # Verificar que se optimizó correctamente
                     if not rutas_chunk or len(rutas_chunk) == 0:
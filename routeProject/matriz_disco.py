@@ -0,0 +1,75 @@
+# routeProject/matriz_disco.py
+import hashlib
+import os
+import numpy as np
+from typing import Optional
+
+from distancias import matriz_tiempos_haversine
+
+
+class MatrizEnDisco:
+    """Construye matrices de tiempos por bloques de filas sobre un numpy.memmap"""
+
+    def __init__(self, directorio: str = "datos/salida/matrices", tamano_bloque: int = 512):
+        self.directorio = directorio
+        self.tamano_bloque = tamano_bloque
+
+    def _ruta_matriz(self, lats: np.ndarray, lons: np.ndarray,
+                     velocidad_kmh: float, minimo_minutos: int, dtype=np.float64) -> str:
+        """Nombre de archivo determinista según coordenadas, parámetros y precisión"""
+        huella = hashlib.sha1()
+        huella.update(np.ascontiguousarray(lats, dtype=np.float64).tobytes())
+        huella.update(np.ascontiguousarray(lons, dtype=np.float64).tobytes())
+        # float32 y float64 pueden redondear distinto algún tramo: no comparten archivo
+        huella.update(f"{velocidad_kmh}|{minimo_minutos}|{np.dtype(dtype).name}".encode('utf-8'))
+        return os.path.join(self.directorio, f"matriz_{len(lats)}_{huella.hexdigest()[:16]}.int32")
+
+    def _abrir(self, ruta: str, n: int) -> Optional[np.memmap]:
+        """Abre una matriz ya construida si el archivo está completo"""
+        if not os.path.exists(ruta) or os.path.getsize(ruta) != n * n * 4:
+            return None
+        return np.memmap(ruta, dtype=np.int32, mode='r', shape=(n, n))
+
+    def obtener(self, lats, lons, velocidad_kmh: float = 40.0, minimo_minutos: int = 1,
+                dtype=np.float64) -> np.memmap:
+        """
+        Devuelve la matriz de tiempos haversine respaldada en disco.
+
+        Si ya existe una matriz para las mismas coordenadas y parámetros se
+        reutiliza sin recalcular. La memoria usada al construirla depende de
+        tamano_bloque x n, no de n².
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        n = len(lats)
+
+        ruta = self._ruta_matriz(lats, lons, velocidad_kmh, minimo_minutos, dtype)
+        matriz = self._abrir(ruta, n)
+        if matriz is not None:
+            print(f"Reutilizando matriz en disco: {ruta}")
+            return matriz
+
+        os.makedirs(self.directorio, exist_ok=True)
+        print(f"Construyendo matriz {n}x{n} en disco por bloques de {self.tamano_bloque} filas...")
+
+        # Escribir en un temporal y renombrar al terminar (nunca reutilizar matrices a medias)
+        ruta_temporal = ruta + ".tmp"
+        completa = False
+        try:
+            salida = np.memmap(ruta_temporal, dtype=np.int32, mode='w+', shape=(n, n))
+            try:
+                matriz_tiempos_haversine(lats.astype(dtype, copy=False), lons.astype(dtype, copy=False),
+                                         velocidad_kmh, minimo_minutos, dtype,
+                                         tamano_bloque=self.tamano_bloque, salida=salida)
+                salida.flush()
+            finally:
+                del salida
+            os.replace(ruta_temporal, ruta)
+            completa = True
+        finally:
+            # Una construcción fallida no deja el temporal de n² ocupando disco
+            if not completa and os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+
+        print(f"Matriz guardada en: {ruta}")
+        return self._abrir(ruta, n)
@@ -0,0 +1,87 @@
+# routeProject/memo_limpieza.py
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List
+
+try:
+    from config import LIMPIEZA_MEMO_MAX_ENTRADAS
+except ImportError:
+    LIMPIEZA_MEMO_MAX_ENTRADAS = 100000
+
+
+class MemoLimpieza:
+    """
+    Memo LRU en memoria de textos ya limpiados.
+
+    Las claves son (tipo de limpieza, texto): el limpiador de CSV y el
+    geocodificador comparten la instancia MEMO_LIMPIEZA, así que un valor de
+    Colonia o Zona se limpia una sola vez por proceso aunque se repita en miles
+    de filas o en varios archivos.
+    """
+
+    def __init__(self, max_entradas: int = 100000):
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def limpiar(self, tipo: str, funcion: Callable[[str], str], texto: str) -> str:
+        """Resultado memorizado de funcion(texto)"""
+        clave = (tipo, texto)
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+
+        limpio = funcion(texto)
+        self._guardar({clave: limpio})
+        return limpio
+
+    def limpiar_varios(self, tipo: str, funcion_lote: Callable[[List[str]], List[str]],
+                       textos: Iterable[str]) -> List[str]:
+        """
+        Limpia una lista de textos distintos; los que no están en el memo se
+        pasan juntos a funcion_lote (que recibe y devuelve una lista).
+        """
+        textos = list(textos)
+        resultados = [None] * len(textos)
+        faltantes = []
+        with self._lock:
+            for i, texto in enumerate(textos):
+                clave = (tipo, texto)
+                if clave in self._entradas:
+                    self._entradas.move_to_end(clave)
+                    resultados[i] = self._entradas[clave]
+                else:
+                    faltantes.append(i)
+            self.aciertos += len(textos) - len(faltantes)
+            self.fallos += len(faltantes)
+
+        if faltantes:
+            limpios = funcion_lote([textos[i] for i in faltantes])
+            nuevos: Dict = {}
+            for i, limpio in zip(faltantes, limpios):
+                resultados[i] = limpio
+                nuevos[(tipo, textos[i])] = limpio
+            self._guardar(nuevos)
+        return resultados
+
+    def _guardar(self, nuevos: Dict):
+        with self._lock:
+            self._entradas.update(nuevos)
+            for clave in nuevos:
+                self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def estadisticas(self) -> str:
+        """Resumen de aciertos y fallos del memo"""
+        total = self.aciertos + self.fallos
+        tasa = (self.aciertos / total * 100) if total else 0.0
+        return f"Memo de limpieza: {self.aciertos} aciertos, {self.fallos} fallos ({tasa:.1f}% aciertos)"
+
+
+MEMO_LIMPIEZA = MemoLimpieza(LIMPIEZA_MEMO_MAX_ENTRADAS)
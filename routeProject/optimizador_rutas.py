@@ -1,126 +1,514 @@
 import pandas as pd
-import requests
 import math
+import csv
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 from typing import List, Tuple, Optional
+import os
 import time
+import inspect
 import numpy as np
+from multiprocessing import get_context
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from distancias import matriz_tiempos_haversine, bloque_tiempos_haversine, vecinos_cercanos
+from matriz_disco import MatrizEnDisco
+from cliente_http import ClienteHTTP
+from cache_tiempos import CacheTiempos, pares_faltantes
+from tsp_rapido import resolver_tsp
+from puntos_lejanos import detectar_puntos_lejanos, describir_resumen
+
+try:
+    from config import MATRICES_DIR, MATRIZ_UMBRAL_DISCO, MATRIZ_TAMANO_BLOQUE
+except ImportError:
+    MATRICES_DIR = "datos/salida/matrices"
+    MATRIZ_UMBRAL_DISCO = 2000
+    MATRIZ_TAMANO_BLOQUE = 512
+
+try:
+    from config import HTTP_REINTENTOS, HTTP_BACKOFF
+except ImportError:
+    HTTP_REINTENTOS = 3
+    HTTP_BACKOFF = 0.5
+
+try:
+    from config import OSRM_TABLE_URL, OSRM_TAMANO_BLOQUE, OSRM_WORKERS
+except ImportError:
+    OSRM_TABLE_URL = "http://router.project-osrm.org/table/v1/driving"
+    OSRM_TAMANO_BLOQUE = 50
+    OSRM_WORKERS = 4
+
+try:
+    from config import TIEMPOS_CACHE_PATH, TIEMPOS_CACHE_MAX_ENTRADAS, TIEMPOS_CACHE_DECIMALES
+except ImportError:
+    TIEMPOS_CACHE_PATH = "datos/salida/cache_tiempos.sqlite"
+    TIEMPOS_CACHE_MAX_ENTRADAS = 2000000
+    TIEMPOS_CACHE_DECIMALES = 5
+
+try:
+    from config import OPTIMIZACION_VECINOS_K
+except ImportError:
+    OPTIMIZACION_VECINOS_K = None
+
+try:
+    from config import OPTIMIZACION_TIEMPO_LIMITE, OPTIMIZACION_PROCESOS
+except ImportError:
+    OPTIMIZACION_TIEMPO_LIMITE = 30
+    OPTIMIZACION_PROCESOS = None
+
+try:
+    from config import (OPTIMIZACION_TIEMPO_MINIMO, OPTIMIZACION_SEGUNDOS_POR_PUNTO,
+                        OPTIMIZACION_ESTANCAMIENTO, OPTIMIZACION_TSP_RAPIDO_MAX,
+                        OPTIMIZACION_HISTORIAL_PATH)
+except ImportError:
+    OPTIMIZACION_TIEMPO_MINIMO = 1
+    OPTIMIZACION_SEGUNDOS_POR_PUNTO = 0.05
+    OPTIMIZACION_ESTANCAMIENTO = 0.2
+    OPTIMIZACION_TSP_RAPIDO_MAX = 25
+    OPTIMIZACION_HISTORIAL_PATH = None
+
+try:
+    from config import PUNTOS_LEJANOS_CENTRO
+except ImportError:
+    PUNTOS_LEJANOS_CENTRO = "mediana"
+
+# Tiempo máximo por vehículo (8 horas)
+MINUTOS_MAXIMOS_RUTA = 480
 
 class OptimizadorRutas:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.timeout = 30
-    
-    def _calcular_distancia_haversine(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
-        lat1, lon1 = coord1
-        lat2, lon2 = coord2
+    def __init__(self, velocidad_kmh: float = 40.0, minimo_minutos: int = 1,
+                 precision=np.float64, usar_cache_tiempos: bool = True,
+                 vecinos_k: Optional[int] = OPTIMIZACION_VECINOS_K):
+        # Cliente con reintentos: un 502 transitorio de OSRM no debe mandar la zona a haversine
+        self.http = ClienteHTTP(tamano_pool=OSRM_WORKERS, reintentos=HTTP_REINTENTOS, backoff=HTTP_BACKOFF, timeout=30)
+        
+        # Bloques de la matriz OSRM (orígenes x destinos por petición) y peticiones simultáneas
+        self.tamano_bloque_osrm = OSRM_TAMANO_BLOQUE
+        self.osrm_workers = OSRM_WORKERS
         
-        # Radio de la Tierra en km
-        R = 6371.0
+        # Caché de tiempos por par de coordenadas: solo se piden a OSRM los pares faltantes
+        self.cache_tiempos = None
+        if usar_cache_tiempos:
+            self.cache_tiempos = CacheTiempos(TIEMPOS_CACHE_PATH, TIEMPOS_CACHE_MAX_ENTRADAS,
+                                              TIEMPOS_CACHE_DECIMALES)
         
-        # Convertir grados a radianes
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
+        # Parámetros de la matriz haversine (velocidad promedio y tiempo mínimo por tramo)
+        self.velocidad_kmh = velocidad_kmh
+        self.minimo_minutos = minimo_minutos
+        # np.float32 reduce a la mitad la memoria temporal en matrices grandes
+        self.precision = precision
+        # k vecinos del modo disperso (None = todos los arcos con costo real)
+        self.vecinos_k = vecinos_k
         
-        # Diferencias
-        dlon = lon2_rad - lon1_rad
-        dlat = lat2_rad - lat1_rad
+        # Matrices grandes se construyen por bloques en disco y se reutilizan entre corridas
+        self.umbral_disco = MATRIZ_UMBRAL_DISCO
+        self.matriz_disco = MatrizEnDisco(MATRICES_DIR, MATRIZ_TAMANO_BLOQUE)
         
-        # Fórmula haversine
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        # Límite de tiempo del solver por llamada a optimizar_ruta (segundos)
+        self.tiempo_limite = OPTIMIZACION_TIEMPO_LIMITE
+        self.usar_cache_tiempos = usar_cache_tiempos
         
-        return R * c
+        # Evolución del objetivo del último solve: [(segundos, objetivo), ...]
+        self.historial_objetivo = []
+        # Objetivo de la solución devuelta por el último solve de OR-Tools
+        self.ultimo_objetivo = None
+        
+        # Rutas del día anterior para arrancar en caliente (Cuenta, notificador_id, orden_parada)
+        self.rutas_previas = None
     
-    def _filtrar_puntos_lejanos(self, coordenadas: List[Tuple[float, float]], 
-                              max_distancia_km: float = 25) -> List[int]:
-        """Identifica puntos que están muy lejos del centroide (más de 25km)"""
-        if len(coordenadas) <= 1:
-            return []
+    def cargar_rutas_previas(self, archivo: str) -> bool:
+        """
+        Carga una salida anterior (rutas_*notificadores.csv o ruta_unica_*.csv)
+        para usarla como solución inicial en optimizar_ruta.
+        """
+        try:
+            df = pd.read_csv(archivo, dtype={'Cuenta': str}, encoding='utf-8')
+        except Exception as e:
+            print(f"No se pudieron cargar las rutas previas '{archivo}': {e}")
+            return False
+        
+        if 'Cuenta' not in df.columns or 'orden_parada' not in df.columns:
+            print(f"Rutas previas sin columnas 'Cuenta' y 'orden_parada': {archivo}")
+            return False
+        
+        if 'notificador_id' not in df.columns:
+            df['notificador_id'] = 1
+        
+        df = df.dropna(subset=['Cuenta'])
+        df['Cuenta'] = df['Cuenta'].astype(str).str.strip()
+        self.rutas_previas = (df[['Cuenta', 'notificador_id', 'orden_parada']]
+                              .drop_duplicates('Cuenta')
+                              .reset_index(drop=True))
+        print(f"Rutas previas cargadas: {len(self.rutas_previas)} cuentas, "
+              f"{self.rutas_previas['notificador_id'].nunique()} rutas")
+        return True
+    
+    def _rutas_iniciales(self, df: pd.DataFrame, matriz: np.ndarray, num_vehiculos: int,
+                         depot: Optional[int] = 0, capacidad: Optional[int] = None) -> Optional[List[List[int]]]:
+        """
+        Traduce las rutas previas a nodos actuales (sin el depósito).
+        
+        Las cuentas que ya estaban conservan su orden y su ruta (una ruta previa
+        por vehículo, en orden de notificador_id); las cuentas nuevas o que
+        sobran se insertan donde aumentan menos el tiempo. depot=None indica
+        rutas abiertas (depósito ficticio): llegar o salir de él no cuesta.
+        Con capacidad, una ruta previa más larga se parte en tramos de a lo más
+        capacidad cuentas, cada uno para un vehículo.
+        """
+        if self.rutas_previas is None or 'Cuenta' not in df.columns:
+            return None
+        
+        cuentas = df['Cuenta'].astype(str).str.strip().reset_index(drop=True)
+        previas = pd.DataFrame({'Cuenta': cuentas, 'nodo': np.arange(len(cuentas))})
+        previas = previas.merge(self.rutas_previas, on='Cuenta', how='left')
+        previas = previas[previas['nodo'] != depot]
+        conocidas = previas.dropna(subset=['orden_parada'])
+        if conocidas.empty:
+            return None
         
-        # Calcular centroide
-        lats = [lat for lat, lon in coordenadas]
-        lons = [lon for lat, lon in coordenadas]
-        centro_lat = sum(lats) / len(lats)
-        centro_lon = sum(lons) / len(lons)
+        rutas: List[List[int]] = [[] for _ in range(num_vehiculos)]
+        nuevos = previas.loc[previas['orden_parada'].isna(), 'nodo'].tolist()
+        grupos = conocidas.sort_values(['notificador_id', 'orden_parada']).groupby('notificador_id', sort=True)
+        tramos = []
+        for _, grupo in grupos:
+            nodos = grupo['nodo'].tolist()
+            paso = capacidad if capacidad else len(nodos)
+            tramos.extend(nodos[i:i + paso] for i in range(0, len(nodos), paso))
+        for k, tramo in enumerate(tramos):
+            if k < num_vehiculos:
+                rutas[k] = tramo
+            else:
+                nuevos.extend(tramo)
         
-        puntos_lejanos = []
-        for i, (lat, lon) in enumerate(coordenadas):
-            distancia = self._calcular_distancia_haversine((centro_lat, centro_lon), (lat, lon))
-            if distancia > max_distancia_km:
-                puntos_lejanos.append(i)
-                print(f"Punto {i+1} está a {distancia:.1f} km del centro - Marcado como NO LOCALIZABLE")
+        m = np.asarray(matriz)
+        for nodo in nuevos:
+            mejor = None
+            for k, ruta in enumerate(rutas):
+                if capacidad is not None and len(ruta) >= capacidad:
+                    continue
+                if depot is not None:
+                    anteriores = np.array([depot] + ruta)
+                    siguientes = np.array(ruta + [depot])
+                    costos = m[anteriores, nodo] + m[nodo, siguientes] - m[anteriores, siguientes]
+                elif ruta:
+                    r = np.array(ruta)
+                    costos = np.concatenate(([m[nodo, r[0]]],
+                                             m[r[:-1], nodo] + m[nodo, r[1:]] - m[r[:-1], r[1:]],
+                                             [m[r[-1], nodo]]))
+                else:
+                    costos = np.zeros(1)
+                posicion = int(np.argmin(costos))
+                if mejor is None or costos[posicion] < mejor[0]:
+                    mejor = (costos[posicion], k, posicion)
+            if mejor is None:
+                print("Arranque en caliente descartado: las cuentas no caben en la capacidad de los vehículos")
+                return None
+            rutas[mejor[1]].insert(mejor[2], int(nodo))
         
-        return puntos_lejanos
+        print(f"Arranque en caliente: {len(conocidas)} cuentas de la ruta previa, "
+              f"{len(nuevos)} insertadas")
+        return rutas
     
-    def _matriz_distancias_euclidianas(self, coordenadas: List[Tuple[float, float]]) -> List[List[int]]:
-        #Matriz de distancias euclidianas optimizada con numpy
+    def _filtrar_puntos_lejanos(self, coordenadas: List[Tuple[float, float]], 
+                              max_distancia_km: float = 25) -> np.ndarray:
+        """Máscara de puntos a más de max_distancia_km del centro de la zona"""
+        coords = np.asarray(coordenadas, dtype=np.float64).reshape(-1, 2)
+        mascara, resumen = detectar_puntos_lejanos(coords[:, 0], coords[:, 1], max_distancia_km,
+                                                   PUNTOS_LEJANOS_CENTRO)
+        if resumen['lejanos']:
+            print(f"{describir_resumen(resumen)} - Marcados como NO LOCALIZABLES")
+        return mascara
+    
+    def _matriz_distancias_euclidianas(self, coordenadas: List[Tuple[float, float]]) -> np.ndarray:
+        """Matriz de tiempos (int32, minutos) por distancia haversine vectorizada"""
         n = len(coordenadas)
         if n == 0:
-            return []
+            return np.zeros((0, 0), dtype=np.int32)
         
         # Convertir a arrays de numpy para cálculo vectorizado
-        lats = np.array([coord[0] for coord in coordenadas])
-        lons = np.array([coord[1] for coord in coordenadas])
+        coords = np.asarray(coordenadas, dtype=np.float64)
+        
+        if n > self.umbral_disco:
+            return self.matriz_disco.obtener(
+                coords[:, 0], coords[:, 1],
+                velocidad_kmh=self.velocidad_kmh,
+                minimo_minutos=self.minimo_minutos,
+                dtype=self.precision)
         
-        # Crear matriz de distancias
-        matriz = np.zeros((n, n), dtype=int)
+        return matriz_tiempos_haversine(
+            coords[:, 0], coords[:, 1],
+            velocidad_kmh=self.velocidad_kmh,
+            minimo_minutos=self.minimo_minutos,
+            dtype=self.precision)
+    
+    def _consultar_bloque_osrm(self, coordenadas: List[Tuple[float, float]],
+                               fuentes: List[int], destinos: List[int]) -> np.ndarray:
+        """Pide a OSRM /table solo el bloque fuentes x destinos (minutos enteros)"""
+        # Unión de índices sin repetir: fuentes y destinos se referencian por posición
+        indices = list(dict.fromkeys(list(fuentes) + list(destinos)))
+        posicion = {indice: k for k, indice in enumerate(indices)}
+        
+        coordenadas_str = ';'.join(f"{coordenadas[i][1]:.6f},{coordenadas[i][0]:.6f}" for i in indices)
+        url = f"{OSRM_TABLE_URL}/{coordenadas_str}"
+        params = {
+            'annotations': 'duration',
+            'sources': ';'.join(str(posicion[i]) for i in fuentes),
+            'destinations': ';'.join(str(posicion[i]) for i in destinos),
+        }
+        
+        response = self.http.get(url, params=params, timeout=15, endpoint='osrm_table')
+        response.raise_for_status()
+        
+        data = response.json()
+        
+        if 'durations' not in data:
+            raise ValueError(f"OSRM no devolvió matriz de duraciones ({data.get('code', 'sin código')})")
+        
+        # Convertir segundos a minutos enteros (None = sin ruta)
+        segundos = np.array(data['durations'], dtype=np.float64)
+        if segundos.shape != (len(fuentes), len(destinos)):
+            raise ValueError(f"OSRM devolvió un bloque de tamaño {segundos.shape}")
+        
+        return np.where(np.isnan(segundos), 9999, np.round(segundos / 60)).astype(np.int32)
+    
+    def _bloque_haversine(self, coordenadas: List[Tuple[float, float]],
+                          fuentes: List[int], destinos: List[int]) -> np.ndarray:
+        """Bloque fuentes x destinos estimado por línea recta (respaldo de bloques fallidos)"""
+        coords = np.asarray(coordenadas, dtype=np.float64)
+        filas = coords[fuentes]
+        columnas = coords[destinos]
+        bloque = bloque_tiempos_haversine(filas[:, 0], filas[:, 1], columnas[:, 0], columnas[:, 1],
+                                          self.velocidad_kmh, self.minimo_minutos, self.precision)
+        # Un punto consigo mismo no tiene costo
+        bloque[np.asarray(fuentes)[:, None] == np.asarray(destinos)[None, :]] = 0
+        return bloque
+    
+    def _llenar_matriz_osrm(self, coordenadas: List[Tuple[float, float]], matriz: np.ndarray,
+                            fuentes: List[int], destinos: List[int]) -> Tuple[List[Tuple[List[int], List[int]]], int]:
+        """
+        Llena matriz[fuentes x destinos] con OSRM dividiendo en bloques concurrentes.
         
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    distancia_km = self._calcular_distancia_haversine(
-                        (lats[i], lons[i]), (lats[j], lons[j])
-                    )
-                    # Convertir distancia a tiempo (assuming 40 km/h average speed)
-                    tiempo_minutos = int((distancia_km / 40) * 60)
-                    matriz[i, j] = max(1, tiempo_minutos)  # Mínimo 1 minuto
+        Los bloques que fallan se calculan con haversine. Devuelve
+        (bloques obtenidos de OSRM, bloques totales).
+        """
+        tamano = self.tamano_bloque_osrm
+        bloques = [(fuentes[i:i + tamano], destinos[j:j + tamano])
+                   for i in range(0, len(fuentes), tamano)
+                   for j in range(0, len(destinos), tamano)]
         
-        return matriz.tolist()
+        exitosos = []
+        with ThreadPoolExecutor(max_workers=self.osrm_workers) as executor:
+            futuros = {executor.submit(self._consultar_bloque_osrm, coordenadas, f, d): (f, d)
+                       for f, d in bloques}
+            for futuro in as_completed(futuros):
+                f, d = futuros[futuro]
+                try:
+                    matriz[np.ix_(f, d)] = futuro.result()
+                    exitosos.append((f, d))
+                except Exception as e:
+                    print(f"Bloque OSRM {len(f)}x{len(d)} falló ({e}) - usando distancia en línea recta")
+                    matriz[np.ix_(f, d)] = self._bloque_haversine(coordenadas, f, d)
+        
+        return exitosos, len(bloques)
     
-    def obtener_matriz_tiempos(self, coordenadas: List[Tuple[float, float]]) -> List[List[int]]:
+    def obtener_matriz_tiempos(self, coordenadas: List[Tuple[float, float]]) -> np.ndarray:
         try:
             # Si hay pocas coordenadas, usar matriz euclidiana (más rápido)
             if len(coordenadas) <= 2:
                 return self._matriz_distancias_euclidianas(coordenadas)
             
-            # Formatear coordenadas para OSRM
-            coordenadas_str = ';'.join([f"{lon},{lat}" for lat, lon in coordenadas])
-            
-            url = f"http://router.project-osrm.org/table/v1/driving/{coordenadas_str}"
-            params = {
-                'annotations': 'duration',
-            }
+            # Zonas muy grandes no caben en una sola petición: matriz en disco
+            if len(coordenadas) > self.umbral_disco:
+                return self._matriz_distancias_euclidianas(coordenadas)
             
-            print(f"Solicitando matriz OSRM para {len(coordenadas)} puntos...")
-            response = self.session.get(url, params=params, timeout=15)
-            response.raise_for_status()
+            if self.cache_tiempos is None:
+                n = len(coordenadas)
+                matriz_tiempos = np.empty((n, n), dtype=np.int32)
+                indices = list(range(n))
+                print(f"Solicitando matriz OSRM para {n} puntos en bloques de {self.tamano_bloque_osrm}...")
+                exitosos, total = self._llenar_matriz_osrm(coordenadas, matriz_tiempos, indices, indices)
+                self._reportar_bloques_osrm(len(exitosos), total)
+                return matriz_tiempos
             
-            data = response.json()
+            # Trabajar sobre puntos únicos (coordenadas redondeadas) y consultar la caché por pares
+            claves = self.cache_tiempos.claves(coordenadas)
+            claves_unicas, primeras, codigos = np.unique(claves, return_index=True, return_inverse=True)
+            claves_unicas = claves_unicas.tolist()
+            coords_unicas = [coordenadas[i] for i in primeras]
             
-            if 'durations' not in data:
-                raise ValueError("OSRM no devolvió matriz de duraciones")
+            matriz_unica, conocidos = self.cache_tiempos.obtener(claves_unicas)
+            nuevos, pedir_todo = pares_faltantes(conocidos)
             
-            duraciones = data['durations']
+            if pedir_todo:
+                todos = list(range(len(claves_unicas)))
+                pedidos = [(todos, todos)]
+            elif nuevos:
+                # Renglones y columnas de los puntos nuevos: nuevos x todos y resto x nuevos
+                conjunto_nuevos = set(nuevos)
+                resto = [i for i in range(len(claves_unicas)) if i not in conjunto_nuevos]
+                pedidos = [(nuevos, list(range(len(claves_unicas))))]
+                if resto:
+                    pedidos.append((resto, nuevos))
+            else:
+                pedidos = []
             
-            # Convertir segundos a minutos enteros
-            matriz_tiempos = []
-            for fila in duraciones:
-                fila_minutos = [int(round(duration / 60)) if duration is not None else 9999 for duration in fila]
-                matriz_tiempos.append(fila_minutos)
+            exitosos_totales, bloques_totales = 0, 0
+            if pedidos:
+                pares = sum(len(f) * len(d) for f, d in pedidos)
+                print(f"Solicitando a OSRM {pares} pares faltantes ({len(nuevos)} puntos nuevos "
+                      f"de {len(claves_unicas)})...")
+            for fuentes, destinos in pedidos:
+                exitosos, total = self._llenar_matriz_osrm(coords_unicas, matriz_unica, fuentes, destinos)
+                exitosos_totales += len(exitosos)
+                bloques_totales += total
+                # Solo los bloques que vinieron de OSRM se guardan (nunca las estimaciones)
+                for f, d in exitosos:
+                    self.cache_tiempos.guardar([claves_unicas[i] for i in f],
+                                               [claves_unicas[j] for j in d],
+                                               matriz_unica[np.ix_(f, d)])
             
-            print("Matriz OSRM obtenida exitosamente")
-            return matriz_tiempos
+            print(self.cache_tiempos.estadisticas())
+            if bloques_totales:
+                self._reportar_bloques_osrm(exitosos_totales, bloques_totales)
             
+            # Expandir de puntos únicos a todas las paradas
+            return matriz_unica[np.ix_(codigos, codigos)]
+        
         except Exception as e:
             print(f"Error obteniendo matriz de OSRM: {e}")
             print("Usando matriz de distancias euclidianas...")
             return self._matriz_distancias_euclidianas(coordenadas)
     
-    def optimizar_ruta(self, df: pd.DataFrame, num_vehiculos: int = 1) -> Optional[List[List[int]]]:
+    def _reportar_bloques_osrm(self, exitosos: int, total: int):
+        if exitosos == total:
+            print(f"Matriz OSRM obtenida exitosamente ({total} bloques)")
+        else:
+            print(f"Matriz OSRM parcial: {exitosos}/{total} bloques de OSRM, "
+                  f"{total - exitosos} estimados con distancia en línea recta")
+        print(self.http.resumen_latencias())
+
+    def _costos_dispersos(self, coordenadas: List[Tuple[float, float]], matriz: np.ndarray,
+                          k: int, depot: Optional[int] = 0) -> np.ndarray:
+        """
+        Matriz de costos de arco donde solo los k vecinos más cercanos (y los
+        arcos del depósito) conservan su costo real; el resto se penaliza para
+        que la búsqueda local no pierda tiempo en ellos. Con depot=None (depósito
+        ficticio fuera de la matriz) ninguna cuenta tiene arcos especiales.
+        
+        Se llena por bloques de filas: si la matriz de tiempos está en disco, los
+        costos se escriben en su propio np.memmap junto a ella, así que la memoria
+        depende del tamaño de bloque y de n * k, no de n².
+        """
+        n = len(coordenadas)
+        coords = np.asarray(coordenadas, dtype=np.float64)
+        vecinos = vecinos_cercanos(coords[:, 0], coords[:, 1], k)
+        
+        # Arcos con costo real como pares (fila, columna), ordenados por fila.
+        # Simétrico: si j es vecino de i, el arco j -> i también es útil
+        origenes = np.repeat(np.arange(n), vecinos.shape[1])
+        filas = np.concatenate((origenes, vecinos.ravel()))
+        columnas = np.concatenate((vecinos.ravel(), origenes))
+        orden = np.argsort(filas, kind='stable')
+        filas, columnas = filas[orden], columnas[orden]
+        
+        bloque = self.matriz_disco.tamano_bloque
+        inicios = range(0, n, bloque)
+        
+        # Cualquier arco no vecino cuesta más que el arco vecino más caro
+        penalizacion = max(int(matriz[a:a + bloque].max()) for a in inicios) + 1
+        
+        ruta = None
+        if isinstance(matriz, np.memmap) and matriz.filename:
+            ruta = f"{matriz.filename}.k{k}_d{'x' if depot is None else depot}.costos"
+            if os.path.exists(ruta) and os.path.getsize(ruta) == n * n * 4:
+                print(f"Reutilizando costos dispersos en disco: {ruta}")
+                return np.memmap(ruta, dtype=np.int32, mode='r', shape=(n, n))
+            costos = np.memmap(ruta + ".tmp", dtype=np.int32, mode='w+', shape=(n, n))
+        else:
+            costos = np.empty((n, n), dtype=np.int32)
+        
+        reales = 0
+        for a in inicios:
+            b = min(a + bloque, n)
+            penalizados = np.ones((b - a, n), dtype=bool)
+            desde, hasta = np.searchsorted(filas, [a, b])
+            penalizados[filas[desde:hasta] - a, columnas[desde:hasta]] = False
+            if depot is not None:
+                penalizados[:, depot] = False
+                if a <= depot < b:
+                    penalizados[depot - a, :] = False
+            
+            tramo = np.array(matriz[a:b], dtype=np.int32)
+            tramo[penalizados] += penalizacion
+            costos[a:b] = tramo
+            reales += penalizados.size - int(penalizados.sum())
+        
+        print(f"Modo disperso: {reales} de {n * n} arcos con costo real (k={k})")
+        if ruta is None:
+            return costos
+        
+        costos.flush()
+        del costos
+        os.replace(ruta + ".tmp", ruta)
+        return np.memmap(ruta, dtype=np.int32, mode='r', shape=(n, n))
+    
+    def _registrar_matriz(self, routing, manager, matriz: np.ndarray, nativo: bool = True,
+                          deposito_ficticio: bool = False) -> int:
+        """
+        Registra la matriz de tránsito en OR-Tools.
+        
+        Con deposito_ficticio el modelo tiene un nodo más (índice n) cuyos arcos
+        de ida y vuelta cuestan 0, así las rutas son abiertas.
+        
+        Con RegisterTransitMatrix la matriz se copia a C++ y la búsqueda local no
+        vuelve a llamar a Python por cada arco. Solo se hace con matrices en
+        memoria de hasta umbral_disco puntos: una matriz en disco (np.memmap) se
+        lee con un callback de Python que indexa el archivo sin copiarlo, para
+        que la memoria siga dependiendo del tamaño de bloque y no de n². También
+        se usa el callback en versiones de OR-Tools sin esa API.
+        """
+        en_memoria = not isinstance(matriz, np.memmap) and len(matriz) <= self.umbral_disco
+        if nativo and en_memoria and hasattr(routing, 'RegisterTransitMatrix'):
+            completa = np.asarray(matriz, dtype=np.int64)
+            if deposito_ficticio:
+                completa = np.pad(completa, ((0, 1), (0, 1)))
+            return routing.RegisterTransitMatrix(completa.tolist())
+        
+        n = len(matriz)
+        
+        def callback(from_index, to_index):
+            from_node = manager.IndexToNode(from_index)
+            to_node = manager.IndexToNode(to_index)
+            if from_node == n or to_node == n:
+                return 0
+            return int(matriz[from_node, to_node])
+        
+        return routing.RegisterTransitCallback(callback)
+    
+    def optimizar_ruta(self, df: pd.DataFrame, num_vehiculos: int = 1,
+                       vecinos_k: Optional[int] = None,
+                       capacidad: Optional[int] = None,
+                       tiempo_limite: Optional[int] = None,
+                       matriz_tiempos: Optional[np.ndarray] = None) -> Optional[List[List[int]]]:
+        """
+        Optimiza la ruta de los puntos del DataFrame.
+        
+        vecinos_k activa el modo disperso: solo los k vecinos más cercanos de cada
+        parada (más los arcos del depósito) tienen costo real. Si es None se usa
+        el valor del optimizador.
+        
+        capacidad limita el número de cuentas por vehículo. Con varios vehículos
+        o con capacidad las rutas son abiertas: salen de un depósito ficticio
+        (nodo n, arcos de costo 0) y no de una cuenta, así que el objetivo y los
+        480 minutos miden exactamente las rutas devueltas; las rutas vacías no
+        se devuelven. Con un vehículo y sin capacidad la ruta sale de la cuenta 0.
+        
+        tiempo_limite (segundos) reemplaza al del optimizador para esta llamada.
+        Es un tope: el presupuesto real depende del número de puntos y la
+        búsqueda se detiene antes si el objetivo deja de mejorar.
+        
+        matriz_tiempos es una matriz ya calculada para todas las filas de df
+        (p. ej. en el proceso principal); si se da, no se consulta OSRM.
+        """
         if df.empty:
             print("DataFrame vacío - No hay datos para optimizar")
             return None
@@ -131,7 +519,7 @@ class OptimizadorRutas:
         
         # Filtrar puntos lejanos (no incluirlos en la ruta)
         puntos_lejanos = self._filtrar_puntos_lejanos(coordenadas, max_distancia_km=25)
-        puntos_validos = [i for i in range(len(coordenadas)) if i not in puntos_lejanos]
+        puntos_validos = np.flatnonzero(~puntos_lejanos).tolist()
         
         if not puntos_validos:
             print("No hay puntos válidos dentro del radio de 40km")
@@ -146,52 +534,140 @@ class OptimizadorRutas:
         # Crear modelo de datos
         data = {}
         data['num_vehiculos'] = num_vehiculos
-        data['depot'] = 0  # Primer punto como depósito
-        data['matriz_tiempos'] = self.obtener_matriz_tiempos(coords_validos)
+        if matriz_tiempos is not None:
+            data['matriz_tiempos'] = np.asarray(matriz_tiempos)[np.ix_(puntos_validos, puntos_validos)]
+        else:
+            data['matriz_tiempos'] = self.obtener_matriz_tiempos(coords_validos)
         
-        if not data['matriz_tiempos']:
+        if len(data['matriz_tiempos']) == 0:
             print("No se pudo generar matriz de tiempos")
             return None
         
+        n = len(data['matriz_tiempos'])
+        # Varios vehículos: depósito ficticio en el nodo n (rutas abiertas);
+        # un vehículo: el primer punto como depósito
+        deposito_ficticio = num_vehiculos > 1 or capacidad is not None
+        data['depot'] = n if deposito_ficticio else 0
+        
+        # Rutas pequeñas: TSP rápido, sin el costo de construir el modelo de OR-Tools
+        if num_vehiculos == 1 and capacidad is None and len(data['matriz_tiempos']) <= OPTIMIZACION_TSP_RAPIDO_MAX:
+            ruta = self._ruta_rapida(data['matriz_tiempos'])
+            if ruta is None:
+                print("No se encontró solución óptima")
+                return None
+            print("Solución óptima encontrada (TSP rápido)")
+            return [[puntos_validos[i] for i in ruta]]
+        
         # Configurar OR-Tools
         manager = pywrapcp.RoutingIndexManager(
-            len(data['matriz_tiempos']), data['num_vehiculos'], data['depot'])
+            n + (1 if deposito_ficticio else 0), data['num_vehiculos'], data['depot'])
         routing = pywrapcp.RoutingModel(manager)
         
-        def tiempo_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return data['matriz_tiempos'][from_node][to_node]
+        transit_callback_index = self._registrar_matriz(routing, manager, data['matriz_tiempos'],
+                                                        deposito_ficticio=deposito_ficticio)
         
-        transit_callback_index = routing.RegisterTransitCallback(tiempo_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+        if vecinos_k is None:
+            vecinos_k = self.vecinos_k
+        modo_disperso = vecinos_k is not None and 0 < vecinos_k < n - 1
+        if modo_disperso:
+            # El costo usa arcos penalizados; la dimensión de tiempo sigue usando tiempos reales
+            data['costos'] = self._costos_dispersos(coords_validos, data['matriz_tiempos'], vecinos_k,
+                                                    None if deposito_ficticio else data['depot'])
+            costo_callback_index = self._registrar_matriz(routing, manager, data['costos'],
+                                                          deposito_ficticio=deposito_ficticio)
+            routing.SetArcCostEvaluatorOfAllVehicles(costo_callback_index)
+        else:
+            routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
         
         # Agregar restricción de tiempo máximo por vehículo (opcional)
         dimension_name = 'Time'
         routing.AddDimension(
             transit_callback_index,
             0,  # sin tiempo de espera
-            480,  # tiempo máximo por vehículo (8 horas)
+            MINUTOS_MAXIMOS_RUTA,  # tiempo máximo por vehículo (8 horas)
             True,  # empezar en 0
             dimension_name)
         time_dimension = routing.GetDimensionOrDie(dimension_name)
         
+        if capacidad is not None:
+            # Cada cuenta consume una unidad; el depósito ficticio no consume
+            demandas = [1] * n + [0]
+            if hasattr(routing, 'RegisterUnaryTransitVector'):
+                demanda_callback_index = routing.RegisterUnaryTransitVector(demandas)
+            else:
+                def demanda_callback(from_index):
+                    return demandas[manager.IndexToNode(from_index)]
+                demanda_callback_index = routing.RegisterUnaryTransitCallback(demanda_callback)
+            
+            routing.AddDimensionWithVehicleCapacity(
+                demanda_callback_index,
+                0,  # sin holgura
+                [capacidad] * data['num_vehiculos'],
+                True,  # empezar en 0
+                'Cuentas')
+        
         # Configurar solver
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
         search_parameters.first_solution_strategy = (
             routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
-        search_parameters.time_limit.seconds = 30  # 30 segundos máximo
+        presupuesto = self._presupuesto_tiempo(n, tiempo_limite)
+        search_parameters.time_limit.seconds = presupuesto
+        
+        if modo_disperso and hasattr(search_parameters, 'ls_operator_neighbors_ratio'):
+            # Los operadores de búsqueda local solo exploran los k vecinos de cada nodo
+            search_parameters.ls_operator_neighbors_ratio = min(1.0, vecinos_k / n)
+            search_parameters.ls_operator_min_neighbors = vecinos_k
+        
+        # Registrar la evolución del objetivo y cortar si la búsqueda se estanca
+        estancamiento = max(1.0, presupuesto * OPTIMIZACION_ESTANCAMIENTO)
+        historial = []
+        motivo = ['límite de tiempo']
+        inicio = time.perf_counter()
         
-        # Resolver
-        print("Resolviendo problema de ruteo...")
-        solution = routing.SolveWithParameters(search_parameters)
+        def al_encontrar_solucion():
+            objetivo = routing.CostVar().Value()
+            transcurrido = time.perf_counter() - inicio
+            if not historial or objetivo < historial[-1][1]:
+                historial.append((transcurrido, objetivo))
+            elif transcurrido - historial[-1][0] > estancamiento:
+                motivo[0] = 'estancamiento'
+                routing.solver().FinishCurrentSearch()
+        
+        routing.AddAtSolutionCallback(al_encontrar_solucion)
+        
+        # Resolver (desde las rutas previas si hay, si no desde PATH_CHEAPEST_ARC)
+        print(f"Resolviendo problema de ruteo (hasta {presupuesto} s)...")
+        solution = None
+        rutas_iniciales = self._rutas_iniciales(df_validos, data['matriz_tiempos'], data['num_vehiculos'],
+                                                None if deposito_ficticio else data['depot'], capacidad)
+        if rutas_iniciales is not None:
+            routing.CloseModelWithParameters(search_parameters)
+            indices_iniciales = [[manager.NodeToIndex(nodo) for nodo in ruta] for ruta in rutas_iniciales]
+            asignacion_inicial = routing.ReadAssignmentFromRoutes(indices_iniciales, True)
+            if asignacion_inicial:
+                solution = routing.SolveFromAssignmentWithParameters(asignacion_inicial, search_parameters)
+                if not solution:
+                    print("Sin solución desde las rutas previas - resolviendo desde cero")
+            else:
+                print("Arranque en caliente descartado: OR-Tools rechazó las rutas previas "
+                      f"({len(rutas_iniciales)} rutas, la más larga de "
+                      f"{max(map(len, rutas_iniciales), default=0)} cuentas) - resolviendo desde cero")
+        if not solution:
+            solution = routing.SolveWithParameters(search_parameters)
+        self._registrar_historial(n, presupuesto, motivo[0], historial, time.perf_counter() - inicio)
         
         if solution:
             print("Solución óptima encontrada")
+            self.ultimo_objetivo = solution.ObjectiveValue()
             rutas = self._extraer_rutas(manager, routing, solution, data['num_vehiculos'])
             
+            if deposito_ficticio:
+                # El depósito ficticio no es una cuenta; las rutas vacías no se entregan
+                rutas = [[nodo for nodo in ruta if nodo != n] for ruta in rutas]
+                rutas = [ruta for ruta in rutas if ruta]
+            
             # Convertir índices de ruta a índices originales del DataFrame
             rutas_finales = []
             for ruta in rutas:
@@ -203,6 +679,132 @@ class OptimizadorRutas:
             print("No se encontró solución óptima")
             return None
     
+    def _presupuesto_tiempo(self, n: int, tiempo_limite: Optional[int] = None) -> int:
+        """Segundos de búsqueda proporcionales al número de puntos, acotados por el límite"""
+        limite = tiempo_limite or self.tiempo_limite
+        segundos = max(OPTIMIZACION_TIEMPO_MINIMO, math.ceil(OPTIMIZACION_SEGUNDOS_POR_PUNTO * n))
+        return int(min(limite, segundos))
+    
+    def _ruta_rapida(self, matriz: np.ndarray) -> Optional[List[int]]:
+        """Ruta cerrada desde el depósito (0) con tsp_rapido; None si excede el tiempo máximo"""
+        inicio = time.perf_counter()
+        ruta, costo = resolver_tsp(matriz)
+        self.historial_objetivo = [(time.perf_counter() - inicio, costo)]
+        if costo > MINUTOS_MAXIMOS_RUTA:
+            return None
+        return ruta
+    
+    def _registrar_historial(self, n: int, presupuesto: int, motivo: str,
+                             historial: List[Tuple[float, int]], segundos: float):
+        """Guarda la evolución del objetivo del último solve (y la agrega al CSV si está configurado)"""
+        self.historial_objetivo = historial
+        if historial:
+            t_mejor, mejor = historial[-1]
+            print(f"Convergencia: {len(historial)} mejoras, objetivo {mejor} a los {t_mejor:.1f} s; "
+                  f"detenido por {motivo} a los {segundos:.1f} s de {presupuesto} s")
+        
+        if not OPTIMIZACION_HISTORIAL_PATH:
+            return
+        try:
+            nuevo = not os.path.exists(OPTIMIZACION_HISTORIAL_PATH)
+            with open(OPTIMIZACION_HISTORIAL_PATH, 'a', newline='', encoding='utf-8') as archivo:
+                escritor = csv.writer(archivo)
+                if nuevo:
+                    escritor.writerow(['puntos', 'presupuesto', 'motivo', 'segundos', 'objetivo'])
+                for transcurrido, objetivo in historial:
+                    escritor.writerow([n, presupuesto, motivo, f"{transcurrido:.3f}", objetivo])
+        except OSError as e:
+            print(f"No se pudo guardar el historial de convergencia: {e}")
+    
+    def optimizar_chunks(self, chunks: List[pd.DataFrame], procesos: Optional[int] = None,
+                         tiempo_limite: Optional[int] = None) -> List[Optional[List[List[int]]]]:
+        """
+        Resuelve la ruta de cada notificador (un vehículo por chunk) en paralelo.
+        
+        Cada proceso crea un optimizador de la misma clase que este (incluidas
+        subclases) y le copia su configuración; solo el cliente HTTP y la caché
+        SQLite se crean de nuevo en cada proceso. Así cada chunk se resuelve igual
+        que con optimizar_ruta(chunk, 1, tiempo_limite=tiempo_limite).
+        Las matrices de tiempos se piden a OSRM aquí, chunk por chunk con el pool
+        de osrm_workers hilos, y se envían a los procesos: el número de peticiones
+        simultáneas no crece con el número de procesos.
+        Los resultados se devuelven en el orden de los chunks; un chunk que falla
+        devuelve None.
+        """
+        if procesos is None:
+            procesos = OPTIMIZACION_PROCESOS or os.cpu_count() or 1
+        procesos = max(1, min(procesos, len(chunks)))
+        tiempo_limite = tiempo_limite or self.tiempo_limite
+        
+        if procesos == 1:
+            resultados = []
+            for i, chunk in enumerate(chunks):
+                try:
+                    resultados.append(self.optimizar_ruta(chunk, 1, tiempo_limite=tiempo_limite))
+                except Exception as e:
+                    print(f"Error optimizando ruta para notificador {i+1}: {e}")
+                    resultados.append(None)
+            return resultados
+        
+        print(f"Resolviendo {len(chunks)} rutas en {procesos} procesos "
+              f"(hasta {tiempo_limite} s por ruta)...")
+        matrices = []
+        for i, chunk in enumerate(chunks):
+            # Las matrices en disco no se copian a cada proceso: esos chunks la calculan allá
+            if chunk.empty or len(chunk) > self.umbral_disco:
+                matrices.append(None)
+                continue
+            try:
+                matrices.append(self.obtener_matriz_tiempos(list(zip(chunk['lat'], chunk['lon']))))
+            except Exception as e:
+                print(f"Error obteniendo matriz para notificador {i+1}: {e}")
+                matrices.append(None)
+        
+        configuracion = {nombre: valor for nombre, valor in vars(self).items()
+                         if nombre not in _RECURSOS_PROCESO}
+        configuracion['tiempo_limite'] = tiempo_limite
+        # Si algún proceso consulta OSRM, entre todos no pasan de osrm_workers peticiones
+        configuracion['osrm_workers'] = max(1, self.osrm_workers // procesos)
+        # spawn: la GUI llama desde un hilo y fork copiaría locks tomados por otros hilos
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=get_context('spawn'),
+                                 initializer=_iniciar_proceso,
+                                 initargs=(type(self), configuracion)) as executor:
+            # map conserva el orden de los chunks aunque terminen en otro orden
+            resultados = []
+            for i, (rutas, error) in enumerate(executor.map(_resolver_chunk, chunks, matrices)):
+                if error:
+                    print(f"Error optimizando ruta para notificador {i+1}: {error}")
+                resultados.append(rutas)
+        return resultados
+    
+    def optimizar_flota(self, df: pd.DataFrame, cuentas_por_notificador: int,
+                        vecinos_k: Optional[int] = None) -> Optional[List[Tuple[pd.DataFrame, List[int]]]]:
+        """
+        Resuelve toda la zona en un solo VRP con un vehículo por notificador.
+        
+        Cada vehículo lleva como máximo cuentas_por_notificador cuentas y 480
+        minutos. Devuelve (chunk, ruta) por notificador, con la misma forma que
+        dividir_por_notificadores + optimizar_ruta(chunk, 1), o None si no hubo
+        solución (el llamador puede volver a dividir y resolver por separado).
+        """
+        if df.empty or cuentas_por_notificador <= 0:
+            return None
+        
+        if len(df) > self.umbral_disco:
+            print(f"Zona de {len(df)} cuentas demasiado grande para un solo VRP "
+                  f"(máximo {self.umbral_disco})")
+            return None
+        
+        num_vehiculos = math.ceil(len(df) / cuentas_por_notificador)
+        print(f"VRP: {len(df)} cuentas, {num_vehiculos} notificadores de hasta {cuentas_por_notificador} cuentas")
+        rutas = self.optimizar_ruta(df, num_vehiculos, vecinos_k, capacidad=cuentas_por_notificador)
+        
+        if not rutas:
+            return None
+        
+        # Cada ruta se entrega como su propio chunk, ya ordenado
+        return [(df.iloc[ruta].copy(), list(range(len(ruta)))) for ruta in rutas]
+    
     def _extraer_rutas(self, manager, routing, solution, num_vehiculos: int) -> List[List[int]]:
         """Extrae las rutas ordenadas de la solución"""
         rutas = []
@@ -221,27 +823,35 @@ class OptimizadorRutas:
         if len(coordenadas) <= 1:
             return list(range(len(coordenadas)))
         
-        # Para pocos puntos, usar algoritmo simple
+        # Matriz en línea recta (sin red) y TSP rápido: exacto o 2-opt/Or-opt
         matriz = self._matriz_distancias_euclidianas(coordenadas)
-        
-        # Algoritmo del vecino más cercano
-        visitados = set()
-        ruta = [0]  # Empezar desde el primer punto
-        visitados.add(0)
-        
-        current = 0
-        while len(visitados) < len(coordenadas):
-            next_node = None
-            min_dist = float('inf')
-            
-            for i in range(len(coordenadas)):
-                if i not in visitados and matriz[current][i] < min_dist:
-                    min_dist = matriz[current][i]
-                    next_node = i
-            
-            if next_node is not None:
-                ruta.append(next_node)
-                visitados.add(next_node)
-                current = next_node
-        
-        return ruta
\ No newline at end of file
+        ruta, _ = resolver_tsp(matriz)
+        return ruta
+
+
+# Optimizador de cada proceso del pool (no se puede enviar entre procesos: tiene
+# sesión HTTP y conexión SQLite propias)
+_optimizador_proceso = None
+
+# Atributos que cada proceso crea de nuevo en lugar de copiarlos
+_RECURSOS_PROCESO = ('http', 'cache_tiempos')
+
+
+def _iniciar_proceso(clase, configuracion: dict):
+    global _optimizador_proceso
+    # El constructor crea el cliente HTTP y la caché del proceso; el resto de la
+    # configuración (umbral_disco, bloques OSRM, atributos de subclases...) se copia.
+    # Se pasan por nombre solo los parámetros del constructor que son atributos
+    parametros = inspect.signature(clase.__init__).parameters
+    argumentos = {nombre: configuracion[nombre] for nombre in parametros
+                  if nombre != 'self' and nombre in configuracion}
+    _optimizador_proceso = clase(**argumentos)
+    vars(_optimizador_proceso).update(configuracion)
+
+
+def _resolver_chunk(chunk: pd.DataFrame,
+                    matriz: Optional[np.ndarray]) -> Tuple[Optional[List[List[int]]], Optional[str]]:
+    try:
+        return _optimizador_proceso.optimizar_ruta(chunk, 1, matriz_tiempos=matriz), None
+    except Exception as e:
+        return None, str(e)
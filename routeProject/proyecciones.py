@@ -0,0 +1,89 @@
+# routeProject/proyecciones.py
+import numpy as np
+from typing import Tuple
+
+# Elipsoide WGS84 y parámetros UTM
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+UTM_K0 = 0.9996
+UTM_FALSO_ESTE = 500000.0
+UTM_FALSO_NORTE_SUR = 10000000.0
+
+
+def utm_a_wgs84(este, norte, zona: int = 13, hemisferio_norte: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte coordenadas UTM (metros) a latitud/longitud WGS84 en grados.
+
+    Fórmulas inversas de Mercator transversa (Snyder, USGS 1395) evaluadas con
+    NumPy sobre todo el arreglo; el error es de milímetros dentro de la zona.
+    """
+    este = np.asarray(este, dtype=np.float64)
+    norte = np.asarray(norte, dtype=np.float64)
+
+    e2 = WGS84_F * (2 - WGS84_F)
+    ep2 = e2 / (1 - e2)
+    e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+
+    x = este - UTM_FALSO_ESTE
+    y = norte if hemisferio_norte else norte - UTM_FALSO_NORTE_SUR
+
+    # Latitud del pie de la perpendicular (footpoint)
+    m = y / UTM_K0
+    mu = m / (WGS84_A * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+    phi1 = (mu
+            + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * np.sin(2 * mu)
+            + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * np.sin(4 * mu)
+            + (151 * e1 ** 3 / 96) * np.sin(6 * mu)
+            + (1097 * e1 ** 4 / 512) * np.sin(8 * mu))
+
+    sen1 = np.sin(phi1)
+    cos1 = np.cos(phi1)
+    tan1 = np.tan(phi1)
+    n1 = WGS84_A / np.sqrt(1 - e2 * sen1 ** 2)
+    r1 = WGS84_A * (1 - e2) / (1 - e2 * sen1 ** 2) ** 1.5
+    t1 = tan1 ** 2
+    c1 = ep2 * cos1 ** 2
+    d = x / (n1 * UTM_K0)
+
+    lat = phi1 - (n1 * tan1 / r1) * (
+        d ** 2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * ep2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * ep2 - 3 * c1 ** 2) * d ** 6 / 720)
+
+    meridiano_central = np.radians((zona - 1) * 6 - 180 + 3)
+    lon = meridiano_central + (
+        d
+        - (1 + 2 * t1 + c1) * d ** 3 / 6
+        + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * ep2 + 24 * t1 ** 2) * d ** 5 / 120) / cos1
+
+    return np.degrees(lat), np.degrees(lon)
+
+
+def son_proyectadas(lat, lon) -> np.ndarray:
+    """Filas cuyos valores no caben en grados (|lat| > 90 o |lon| > 180): metros proyectados"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    return (np.abs(lat) > 90) | (np.abs(lon) > 180)
+
+
+def reproyectar_columnas(lat, lon, zona: int = 13, hemisferio_norte: bool = True) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Convierte a grados solo las filas proyectadas de un par de columnas lat/lon.
+
+    En UTM la columna "latitud" trae el norte y la "longitud" el este; si vienen
+    intercambiadas (el este no cabe en 100-900 km pero el norte sí) se corrigen.
+    Devuelve (lat, lon, filas convertidas).
+    """
+    lat = np.array(lat, dtype=np.float64)
+    lon = np.array(lon, dtype=np.float64)
+    proyectadas = son_proyectadas(lat, lon)
+    if not proyectadas.any():
+        return lat, lon, 0
+
+    norte = lat[proyectadas]
+    este = lon[proyectadas]
+    intercambiadas = ((este < 100000) | (este > 900000)) & (norte >= 100000) & (norte <= 900000)
+    norte, este = np.where(intercambiadas, este, norte), np.where(intercambiadas, norte, este)
+
+    lat[proyectadas], lon[proyectadas] = utm_a_wgs84(este, norte, zona, hemisferio_norte)
+    return lat, lon, int(proyectadas.sum())
@@ -0,0 +1,86 @@
+# routeProject/puntos_lejanos.py
+import numpy as np
+from typing import Tuple
+from distancias import haversine_km
+
+# El medoide se calcula sobre una muestra: O(m²) en lugar de O(n²)
+MUESTRA_MEDOIDE = 2000
+
+
+def centro_puntos(lats: np.ndarray, lons: np.ndarray, metodo: str = "mediana",
+                  tamano_bloque: int = 512) -> Tuple[float, float]:
+    """
+    Centro del conjunto de puntos.
+
+    'media' es el centroide clásico (lo arrastran los puntos atípicos),
+    'mediana' usa la mediana de cada coordenada y 'medoide' el punto real con
+    menor distancia total a los demás.
+    """
+    if metodo == "media":
+        return float(lats.mean()), float(lons.mean())
+    if metodo == "mediana":
+        return float(np.median(lats)), float(np.median(lons))
+    if metodo != "medoide":
+        raise ValueError(f"Método de centro desconocido: {metodo}")
+
+    if len(lats) > MUESTRA_MEDOIDE:
+        muestra = np.random.default_rng(0).choice(len(lats), MUESTRA_MEDOIDE, replace=False)
+        lats, lons = lats[muestra], lons[muestra]
+
+    totales = np.empty(len(lats))
+    for inicio in range(0, len(lats), tamano_bloque):
+        fin = min(inicio + tamano_bloque, len(lats))
+        totales[inicio:fin] = haversine_km(lats[inicio:fin, None], lons[inicio:fin, None],
+                                           lats[None, :], lons[None, :]).sum(axis=1)
+    mejor = int(np.argmin(totales))
+    return float(lats[mejor]), float(lons[mejor])
+
+
+def detectar_puntos_lejanos(lats, lons, max_distancia_km: float = 25,
+                            metodo: str = "mediana") -> Tuple[np.ndarray, dict]:
+    """
+    Marca los puntos a más de max_distancia_km del centro.
+
+    Devuelve (máscara booleana de puntos lejanos, resumen). Las coordenadas
+    vacías o no numéricas no cuentan para el centro y se marcan como lejanas.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    validos = np.isfinite(lats) & np.isfinite(lons)
+
+    resumen = {
+        'total': len(lats),
+        'lejanos': int((~validos).sum()),
+        'sin_coordenadas': int((~validos).sum()),
+        'metodo': metodo,
+        'centro': None,
+        'max_distancia_km': max_distancia_km,
+        'distancia_maxima_km': 0.0,
+    }
+    mascara = ~validos
+    if len(lats) <= 1 or not validos.any():
+        return mascara, resumen
+
+    centro = centro_puntos(lats[validos], lons[validos], metodo)
+    distancias = np.full(len(lats), np.inf)
+    distancias[validos] = haversine_km(lats[validos], lons[validos], centro[0], centro[1])
+    mascara = distancias > max_distancia_km
+
+    resumen['lejanos'] = int(mascara.sum())
+    resumen['centro'] = centro
+    resumen['distancia_maxima_km'] = float(distancias[validos].max())
+    return mascara, resumen
+
+
+def describir_resumen(resumen: dict) -> str:
+    """Una línea legible con el resultado de detectar_puntos_lejanos"""
+    if not resumen['lejanos']:
+        return f"Sin puntos lejanos ({resumen['total']} puntos dentro de {resumen['max_distancia_km']:.0f} km)"
+    texto = (f"{resumen['lejanos']} de {resumen['total']} puntos a más de "
+             f"{resumen['max_distancia_km']:.0f} km del centro ({resumen['metodo']})")
+    if resumen['centro'] is not None:
+        texto += (f" en {resumen['centro'][0]:.4f}, {resumen['centro'][1]:.4f}; "
+                  f"el más lejano a {resumen['distancia_maxima_km']:.1f} km")
+    if resumen['sin_coordenadas']:
+        texto += f"; {resumen['sin_coordenadas']} sin coordenadas"
+    return texto
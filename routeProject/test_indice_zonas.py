@@ -0,0 +1,32 @@
+# routeProject/test_indice_zonas.py
+import numpy as np
+import pandas as pd
+
+from indice_zonas import IndiceZonas
+
+
+def _tabla_con_vacios() -> pd.DataFrame:
+    return pd.DataFrame({
+        'Domicilio': ['A 1', 'B 2', 'C 3', 'D 4', 'E 5'],
+        'Colonia': ['CHAPALITA', np.nan, 'Chapalita ', 'CENTRO', 'CHAPALITA'],
+        'Zona': ['GUADALAJARA', 'GUADALAJARA', ' guadalajara', np.nan, 'FORÁNEOS'],
+    })
+
+
+def test_celdas_vacias_no_caen_en_otro_grupo():
+    indice = IndiceZonas(_tabla_con_vacios())
+
+    assert indice.filtrar('GUADALAJARA', 'CHAPALITA')['Domicilio'].tolist() == ['A 1', 'C 3']
+    assert indice.filtrar('FORÁNEOS', 'CHAPALITA')['Domicilio'].tolist() == ['E 5']
+    assert indice.filtrar('FORÁNEOS', 'CENTRO').empty
+    assert indice.filtrar('GUADALAJARA', 'CENTRO').empty
+
+
+def test_celdas_vacias_fuera_de_listados():
+    indice = IndiceZonas(_tabla_con_vacios())
+
+    # La fila sin colonia sigue en su zona; la fila sin zona no está en ninguna
+    assert indice.filtrar('GUADALAJARA')['Domicilio'].tolist() == ['A 1', 'B 2', 'C 3']
+    assert indice.zonas() == ['FORÁNEOS', 'GUADALAJARA']
+    assert indice.colonias('GUADALAJARA') == ['CHAPALITA']
+    assert [zona for zona, _ in indice.por_zona()] == ['GUADALAJARA', 'FORÁNEOS']
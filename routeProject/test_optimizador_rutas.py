@@ -0,0 +1,39 @@
+# routeProject/test_optimizador_rutas.py
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("ortools")
+
+from optimizador_rutas import OptimizadorRutas
+
+
+class OptimizadorSinRed(OptimizadorRutas):
+    """Estima los tiempos con haversine en lugar de pedirlos a OSRM"""
+
+    def obtener_matriz_tiempos(self, coordenadas):
+        return self._matriz_distancias_euclidianas(coordenadas)
+
+
+def _dos_grupos(por_grupo: int = 60) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    centros = [(20.70, -103.40), (20.62, -103.30)]
+    lats = np.concatenate([c[0] + rng.uniform(-0.02, 0.02, por_grupo) for c in centros])
+    lons = np.concatenate([c[1] + rng.uniform(-0.02, 0.02, por_grupo) for c in centros])
+    return pd.DataFrame({'lat': lats, 'lon': lons, 'Cuenta': [str(i) for i in range(len(lats))]})
+
+
+def test_objetivo_vrp_igual_a_rutas_devueltas():
+    df = _dos_grupos()
+    optimizador = OptimizadorSinRed(usar_cache_tiempos=False)
+    optimizador.tiempo_limite = 5
+
+    rutas = optimizador.optimizar_ruta(df, 2, capacidad=60)
+
+    assert rutas is not None
+    assert sorted(i for ruta in rutas for i in ruta) == list(range(len(df)))
+    assert all(len(ruta) <= 60 for ruta in rutas)
+
+    matriz = optimizador._matriz_distancias_euclidianas(list(zip(df['lat'], df['lon'])))
+    minutos = sum(int(matriz[ruta[:-1], ruta[1:]].sum()) for ruta in rutas)
+    assert optimizador.ultimo_objetivo == minutos
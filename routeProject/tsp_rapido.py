@@ -0,0 +1,160 @@
+# routeProject/tsp_rapido.py
+"""
+TSP rápido para rutas pequeñas sin construir el modelo de OR-Tools.
+
+Las rutas son cerradas y empiezan en el depósito (índice 0), igual que en
+optimizar_ruta. Las matrices pueden ser asimétricas (tiempos de OSRM).
+"""
+import numpy as np
+from typing import List, Tuple
+
+# Hasta este tamaño Held-Karp es exacto y tarda milisegundos
+HELD_KARP_MAX = 12
+
+
+def costo_ruta(matriz: np.ndarray, ruta: List[int]) -> int:
+    """Costo de la ruta cerrada (incluye el regreso al inicio)"""
+    if len(ruta) < 2:
+        return 0
+    ruta = np.asarray(ruta)
+    return int(np.asarray(matriz)[ruta, np.roll(ruta, -1)].sum())
+
+
+def held_karp(matriz: np.ndarray) -> Tuple[List[int], int]:
+    """Ruta óptima por programación dinámica sobre subconjuntos (O(2^n n²))"""
+    m = np.asarray(matriz, dtype=np.int64)
+    n = len(m)
+    if n <= 2:
+        ruta = list(range(n))
+        return ruta, costo_ruta(m, ruta)
+
+    # Los nodos 1..n-1 corresponden a los bits 0..k-1
+    k = n - 1
+    completo = 1 << k
+    infinito = np.iinfo(np.int64).max // 4
+    costos = np.full((completo, k), infinito, dtype=np.int64)
+    previo = np.full((completo, k), -1, dtype=np.int64)
+    internos = m[1:, 1:]
+    bits = 1 << np.arange(k)
+
+    costos[bits, np.arange(k)] = m[0, 1:]
+    for subconjunto in range(1, completo):
+        if subconjunto & (subconjunto - 1) == 0:
+            continue
+        miembros = np.flatnonzero(subconjunto & bits)
+        anteriores = subconjunto ^ bits[miembros]
+        # candidatos[a, i]: llegar a miembros[a] desde i visitando anteriores[a]
+        candidatos = costos[anteriores] + internos[:, miembros].T
+        mejores = np.argmin(candidatos, axis=1)
+        costos[subconjunto, miembros] = candidatos[np.arange(len(miembros)), mejores]
+        previo[subconjunto, miembros] = mejores
+
+    totales = costos[completo - 1] + m[1:, 0]
+    ultimo = int(np.argmin(totales))
+    costo = int(totales[ultimo])
+
+    ruta = []
+    subconjunto = completo - 1
+    while ultimo >= 0:
+        ruta.append(ultimo + 1)
+        anterior = int(previo[subconjunto, ultimo])
+        subconjunto ^= 1 << ultimo
+        ultimo = anterior
+    return [0] + ruta[::-1], costo
+
+
+def vecino_mas_cercano(matriz: np.ndarray, inicio: int = 0) -> List[int]:
+    """Ruta voraz: siempre al punto no visitado más cercano"""
+    m = np.asarray(matriz, dtype=np.float64)
+    n = len(m)
+    visitado = np.zeros(n, dtype=bool)
+    ruta = [inicio]
+    visitado[inicio] = True
+    actual = inicio
+    for _ in range(n - 1):
+        fila = np.where(visitado, np.inf, m[actual])
+        actual = int(np.argmin(fila))
+        ruta.append(actual)
+        visitado[actual] = True
+    return ruta
+
+
+def dos_opt(matriz: np.ndarray, ruta: List[int]) -> List[int]:
+    """
+    2-opt con la mejor mejora por iteración, evaluando todos los pares (i, j) con NumPy.
+
+    Invertir un tramo cambia el sentido de sus arcos internos, así que con
+    matrices asimétricas se usa la diferencia de sumas acumuladas ida/vuelta.
+    """
+    m = np.asarray(matriz, dtype=np.int64)
+    ruta = list(ruta)
+    n = len(ruta)
+    if n < 4:
+        return ruta
+
+    while True:
+        cerrada = np.asarray(ruta + [ruta[0]])
+        ida = np.concatenate(([0], np.cumsum(m[cerrada[:-1], cerrada[1:]])))
+        vuelta = np.concatenate(([0], np.cumsum(m[cerrada[1:], cerrada[:-1]])))
+
+        # Invertir ruta[i+1..j]: se quitan (i, i+1) y (j, j+1), se agregan (i, j) y (i+1, j+1)
+        i = np.arange(n - 1)[:, None]
+        j = np.arange(n)[None, :]
+        a, b = cerrada[i], cerrada[i + 1]
+        c, d = cerrada[j], cerrada[j + 1]
+        delta = (m[a, c] + m[b, d] - m[a, b] - m[c, d]
+                 + (vuelta[j] - vuelta[i + 1]) - (ida[j] - ida[i + 1]))
+        delta = np.where(j > i + 1, delta, 0)
+
+        mejor = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[mejor] >= 0:
+            return ruta
+        i_mejor, j_mejor = int(mejor[0]), int(mejor[1])
+        ruta[i_mejor + 1:j_mejor + 1] = ruta[i_mejor + 1:j_mejor + 1][::-1]
+
+
+def or_opt(matriz: np.ndarray, ruta: List[int], longitudes=(1, 2, 3)) -> List[int]:
+    """Mueve tramos de 1 a 3 paradas (sin invertirlos) a la posición donde más ahorran"""
+    m = np.asarray(matriz, dtype=np.int64)
+    ruta = list(ruta)
+    n = len(ruta)
+    mejoro = True
+    while mejoro:
+        mejoro = False
+        for longitud in longitudes:
+            inicio = 1  # el depósito no se mueve
+            while inicio + longitud <= n:
+                tramo = ruta[inicio:inicio + longitud]
+                resto = ruta[:inicio] + ruta[inicio + longitud:]
+                anterior = ruta[inicio - 1]
+                siguiente = ruta[(inicio + longitud) % n]
+                ahorro = m[anterior, tramo[0]] + m[tramo[-1], siguiente] - m[anterior, siguiente]
+
+                # Costo de insertar el tramo en cada arco (u, v) del resto de la ruta
+                u = np.asarray(resto)
+                v = np.roll(u, -1)
+                insercion = m[u, tramo[0]] + m[tramo[-1], v] - m[u, v]
+                posicion = int(np.argmin(insercion))
+
+                if insercion[posicion] < ahorro:
+                    ruta = resto[:posicion + 1] + tramo + resto[posicion + 1:]
+                    mejoro = True
+                else:
+                    inicio += 1
+    return ruta
+
+
+def resolver_tsp(matriz: np.ndarray) -> Tuple[List[int], int]:
+    """Exacto hasta HELD_KARP_MAX puntos; si no, vecino más cercano + 2-opt/Or-opt"""
+    n = len(matriz)
+    if n <= HELD_KARP_MAX:
+        return held_karp(matriz)
+
+    ruta = vecino_mas_cercano(matriz)
+    costo = costo_ruta(matriz, ruta)
+    while True:
+        ruta = or_opt(matriz, dos_opt(matriz, ruta))
+        nuevo = costo_ruta(matriz, ruta)
+        if nuevo >= costo:
+            return ruta, nuevo
+        costo = nuevo
@@ -1,19 +1,36 @@
 import pandas as pd
-from typing import List
+import numpy as np
+from typing import List, Optional
 import os
 import math
+from distancias import indice_hilbert
+from puntos_lejanos import detectar_puntos_lejanos
+from indice_zonas import IndiceZonas
+
+try:
+    from config import PARTICION_NOTIFICADORES
+except ImportError:
+    PARTICION_NOTIFICADORES = "hilbert"
+
+try:
+    from config import PUNTOS_LEJANOS_CENTRO
+except ImportError:
+    PUNTOS_LEJANOS_CENTRO = "mediana"
 
 def crear_directorios():
     """Crea los directorios necesarios para el proyecto"""
-    directorios = ['datos/entrada', 'datos/salida', 'mapas']
+    directorios = ['datos/entrada', 'datos/salida', 'datos/cache', 'mapas']
     
     for directorio in directorios:
         os.makedirs(directorio, exist_ok=True)
     
     print("Directorios creados/existen")
 
-def filtrar_por_zona(df: pd.DataFrame, zona: str) -> pd.DataFrame:
-    """Filtra el DataFrame por zona (case insensitive y con trim)"""
+def filtrar_por_zona(df: pd.DataFrame, zona: str, indice: Optional[IndiceZonas] = None) -> pd.DataFrame:
+    """Filtra el DataFrame por zona (case insensitive y con trim); usa el índice si es de este df"""
+    if indice is not None and indice.df is df:
+        return indice.filtrar(zona)
+    
     if df is None or df.empty:
         return pd.DataFrame()
     
@@ -45,8 +62,12 @@ def filtrar_por_zona(df: pd.DataFrame, zona: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 # ✅ NUEVA FUNCIÓN NECESARIA
-def filtrar_por_colonia(df: pd.DataFrame, colonia: str) -> pd.DataFrame:
-    """Filtra el DataFrame por colonia (case insensitive y con trim)"""
+def filtrar_por_colonia(df: pd.DataFrame, colonia: str, indice: Optional[IndiceZonas] = None,
+                        zona: Optional[str] = None) -> pd.DataFrame:
+    """Filtra el DataFrame por colonia (case insensitive y con trim); con índice y zona no recorre df"""
+    if indice is not None and zona is not None:
+        return indice.filtrar(zona, colonia)
+    
     if df is None or df.empty:
         return pd.DataFrame()
     
@@ -75,11 +96,27 @@ def filtrar_por_colonia(df: pd.DataFrame, colonia: str) -> pd.DataFrame:
         print(f"Error filtrando por colonia: {e}")
         return df  # Retornar el DataFrame original en caso de error
 
-def dividir_por_notificadores(df: pd.DataFrame, cuentas_por_notificador: int) -> List[pd.DataFrame]:
-    """Divide el DataFrame en chunks para cada notificador"""
+def dividir_por_notificadores(df: pd.DataFrame, cuentas_por_notificador: int,
+                              metodo: str = None) -> List[pd.DataFrame]:
+    """
+    Divide el DataFrame en chunks para cada notificador.
+    
+    metodo 'hilbert' ordena los domicilios sobre una curva de Hilbert y corta
+    tramos consecutivos de cuentas_por_notificador, así cada notificador recibe
+    un grupo compacto. 'orden' respeta el orden del archivo. Los registros sin
+    coordenadas quedan al final en el orden original.
+    """
     if df is None or df.empty:
         return []
     
+    if metodo is None:
+        metodo = PARTICION_NOTIFICADORES
+    
+    if metodo == 'hilbert' and {'lat', 'lon'}.issubset(df.columns):
+        df = ordenar_por_hilbert(df)
+    elif metodo not in ('hilbert', 'orden'):
+        raise ValueError(f"Método de partición desconocido: {metodo}")
+    
     chunks = []
     total_cuentas = len(df)
     
@@ -89,6 +126,20 @@ def dividir_por_notificadores(df: pd.DataFrame, cuentas_por_notificador: int) ->
     
     return chunks
 
+def ordenar_por_hilbert(df: pd.DataFrame) -> pd.DataFrame:
+    """Reordena las filas según su posición en la curva de Hilbert (sin coordenadas al final)"""
+    lats = pd.to_numeric(df['lat'], errors='coerce').to_numpy(dtype=np.float64)
+    lons = pd.to_numeric(df['lon'], errors='coerce').to_numpy(dtype=np.float64)
+    validos = np.isfinite(lats) & np.isfinite(lons)
+    
+    posiciones = np.flatnonzero(validos)
+    indices = indice_hilbert(lats[validos], lons[validos])
+    # Orden estable: empates en la curva conservan el orden del archivo
+    orden = posiciones[np.argsort(indices, kind='stable')]
+    orden = np.concatenate([orden, np.flatnonzero(~validos)])
+    
+    return df.iloc[orden]
+
 def mostrar_ruta(ruta: List[int], df: pd.DataFrame):
     """Muestra una ruta específica con formato legible"""
     if not ruta or df is None or df.empty:
@@ -98,21 +149,9 @@ def mostrar_ruta(ruta: List[int], df: pd.DataFrame):
     print(f"\nRuta Optimizada ({len(ruta)} paradas):")
     
     # Identificar puntos lejanos (más de 50km del centro)
-    coordenadas = list(zip(df['lat'], df['lon']))
-    puntos_lejanos = set()
-    
-    if len(coordenadas) > 1:
-        # Calcular centroide
-        lats = [lat for lat, lon in coordenadas]
-        lons = [lon for lat, lon in coordenadas]
-        centro_lat = sum(lats) / len(lats)
-        centro_lon = sum(lons) / len(lons)
-        
-        for i, (lat, lon) in enumerate(coordenadas):
-            # Calcular distancia aproximada
-            dist = calcular_distancia_haversine(lat, lon, centro_lat, centro_lon)
-            if dist > 50:  # Más de 50km
-                puntos_lejanos.add(i)
+    puntos_lejanos, _ = detectar_puntos_lejanos(pd.to_numeric(df['lat'], errors='coerce'),
+                                                pd.to_numeric(df['lon'], errors='coerce'),
+                                                50, PUNTOS_LEJANOS_CENTRO)
     
     for i, idx in enumerate(ruta):
         try:
@@ -123,7 +162,7 @@ def mostrar_ruta(ruta: List[int], df: pd.DataFrame):
             
             domicilio = domicilio_limpio if domicilio_limpio else domicilio_original
             
-            if idx in puntos_lejanos:
+            if puntos_lejanos[idx]:
                 print(f"  {i+1}. {cuenta} - {domicilio} (lejano)")
             else:
                 print(f"  {i+1}. {cuenta} - {domicilio}")